@@ -0,0 +1,187 @@
+import asyncio
+import time
+from collections import Counter, deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from math import ceil
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.metricas import registrar_etapa
+from app.services.config import service_settings as settings
+
+
+class ClasseDeAdmissao:
+    def __init__(
+        self,
+        nome: str,
+        capacidade: int,
+        fila_maxima: int,
+        espera_maxima: float,
+        por_cliente: int | None = None,
+    ):
+        self.nome = nome
+        self.capacidade = capacidade
+        self.fila_maxima = fila_maxima
+        self.espera_maxima = espera_maxima
+        self.por_cliente = por_cliente
+        self.em_uso = 0
+        self.duracao_media = 1.0
+        self.admitidas = 0
+        self.rejeicoes: Counter[str] = Counter()
+        self._fila: deque[tuple[int, asyncio.Future]] = deque()
+        self._clientes: Counter[str] = Counter()
+
+    def _retry_after(self, custo: int) -> int:
+        # Estimativa de quando haverá espaço: a duração média das requisições
+        # da classe multiplicada pelas "voltas" necessárias para esvaziar a fila.
+        ocupacao = (sum(c for c, _ in self._fila) + custo) / self.capacidade
+        return max(ceil(self.duracao_media * ocupacao), 1)
+
+    def _rejeitar(self, motivo: str, custo: int):
+        self.rejeicoes[motivo] += 1
+        if motivo == "cliente":
+            codigo = status.HTTP_429_TOO_MANY_REQUESTS
+            detalhe = "Limite de requisições simultâneas do cliente atingido."
+        else:
+            codigo = status.HTTP_503_SERVICE_UNAVAILABLE
+            detalhe = "Servidor ocupado, tente novamente em instantes."
+        raise HTTPException(
+            status_code=codigo,
+            detail=detalhe,
+            headers={"Retry-After": str(self._retry_after(custo))},
+        )
+
+    def _despachar(self):
+        while self._fila:
+            custo, futuro = self._fila[0]
+            if futuro.done():
+                self._fila.popleft()
+                continue
+            if self.em_uso + custo > self.capacidade:
+                return
+            self._fila.popleft()
+            self.em_uso += custo
+            futuro.set_result(None)
+
+    async def _aguardar(self, custo: int):
+        if len(self._fila) >= self.fila_maxima:
+            self._rejeitar("fila_cheia", custo)
+        futuro = asyncio.get_running_loop().create_future()
+        item = (custo, futuro)
+        self._fila.append(item)
+        inicio = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.espera_maxima):
+                await futuro
+        except BaseException as erro:
+            concedida = futuro.done() and not futuro.cancelled()
+            if not concedida:
+                if item in self._fila:
+                    self._fila.remove(item)
+                self._despachar()
+                if isinstance(erro, TimeoutError):
+                    self._rejeitar("prazo", custo)
+                raise
+            # A vaga foi concedida no mesmo instante em que o prazo expirou
+            # ou a requisição foi cancelada.
+            if not isinstance(erro, TimeoutError):
+                self._liberar(custo)
+                raise
+        finally:
+            registrar_etapa("admissao", time.perf_counter() - inicio)
+
+    def _liberar(self, custo: int):
+        self.em_uso -= custo
+        self._despachar()
+
+    @asynccontextmanager
+    async def ocupar(self, custo: int, cliente: str):
+        custo = min(custo, self.capacidade)
+        if self.por_cliente and self._clientes[cliente] + custo > self.por_cliente:
+            self._rejeitar("cliente", custo)
+        self._clientes[cliente] += custo
+        try:
+            if not self._fila and self.em_uso + custo <= self.capacidade:
+                self.em_uso += custo
+            else:
+                await self._aguardar(custo)
+            self.admitidas += 1
+            inicio = time.monotonic()
+            try:
+                yield
+            finally:
+                self.duracao_media += 0.2 * (
+                    time.monotonic() - inicio - self.duracao_media
+                )
+                self._liberar(custo)
+        finally:
+            self._clientes[cliente] -= custo
+            if not self._clientes[cliente]:
+                del self._clientes[cliente]
+
+    def estatisticas(self) -> dict:
+        return {
+            "capacidade": self.capacidade,
+            "em_uso": self.em_uso,
+            "na_fila": len(self._fila),
+            "admitidas": self.admitidas,
+            "rejeicoes": dict(self.rejeicoes),
+            "duracao_media_segundos": round(self.duracao_media, 3),
+        }
+
+
+classes = {
+    "consulta": ClasseDeAdmissao(
+        "consulta",
+        settings.ADMISSAO_CONSULTA_CAPACIDADE,
+        settings.ADMISSAO_FILA_MAXIMA,
+        settings.ADMISSAO_ESPERA_MAXIMA_SEGUNDOS,
+        settings.ADMISSAO_POR_CLIENTE,
+    ),
+    "pesada": ClasseDeAdmissao(
+        "pesada",
+        settings.ADMISSAO_PESADA_CAPACIDADE,
+        settings.ADMISSAO_FILA_MAXIMA,
+        settings.ADMISSAO_ESPERA_MAXIMA_SEGUNDOS,
+        settings.ADMISSAO_POR_CLIENTE,
+    ),
+}
+
+
+def _cliente(request: Request) -> str:
+    if settings.ADMISSAO_CABECALHO_CLIENTE:
+        identificador = request.headers.get(settings.ADMISSAO_CABECALHO_CLIENTE)
+        if identificador:
+            # Em cabeçalhos como X-Forwarded-For, só a última entrada (a
+            # adicionada pelo proxy) é confiável; as anteriores vêm do cliente.
+            return identificador.split(",")[-1].strip()
+    return request.client.host if request.client else "desconhecido"
+
+
+# As vagas ficam em uma pilha aberta durante toda a resposta, e não na
+# dependência, porque a saída das dependências com yield acontece antes de
+# uma StreamingResponse terminar de ser enviada.
+class AdmissaoMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        async with AsyncExitStack() as vagas:
+            scope["admissao"] = vagas
+            await self.app(scope, receive, send)
+
+
+def admissao(classe: str, custo: int = 1):
+    async def admitir(request: Request):
+        if settings.ADMISSAO_ATIVA:
+            await request.scope["admissao"].enter_async_context(
+                classes[classe].ocupar(custo, _cliente(request))
+            )
+
+    return Depends(admitir)
+
+
+def estatisticas() -> dict:
+    return {nome: classe.estatisticas() for nome, classe in classes.items()}
@@ -0,0 +1,225 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from datetime import UTC, datetime
+import httpx
+from fastapi import HTTPException, status
+
+from app.metricas import registrar_erro_upstream, registrar_upstream
+
+from .config import api_settings as settings
+from .resiliencia import CircuitBreaker, TokenBucket
+from .singleflight import SingleFlight
+
+PROVIDERS = {
+    "viacep": "VIACEP",
+    "locationiq": "LOCATIONIQ",
+    "overpass": "OVERPASS",
+    "tomtom": "TOMTOM",
+    "weatherapi": "WEATHER_API",
+}
+
+CONCURRENCY = {
+    "viacep": settings.VIACEP_CONCURRENCY,
+    "locationiq": settings.LOCATIONIQ_CONCURRENCY,
+    "overpass": settings.OVERPASS_CONCURRENCY,
+    "tomtom": settings.TOMTOM_CONCURRENCY,
+    "weatherapi": settings.WEATHER_API_CONCURRENCY,
+    "googletrans": settings.GOOGLETRANS_CONCURRENCY,
+}
+
+
+def _config(provider: str, nome: str):
+    return getattr(settings, f"{PROVIDERS[provider]}_{nome}")
+
+
+_clients: dict[str, httpx.AsyncClient] = {}
+_semaphores: dict[str, asyncio.Semaphore] = {}
+_voos = {provider: SingleFlight(provider) for provider in PROVIDERS}
+_buckets = {
+    provider: TokenBucket(
+        _config(provider, "RATE_LIMIT"), _config(provider, "RATE_BURST")
+    )
+    for provider in PROVIDERS
+    if _config(provider, "RATE_LIMIT")
+}
+_disjuntores = {
+    provider: CircuitBreaker(
+        provider,
+        settings.CIRCUIT_BREAKER_FALHAS,
+        settings.CIRCUIT_BREAKER_ESPERA_SEGUNDOS,
+    )
+    for provider in PROVIDERS
+}
+hedges = {provider: 0 for provider in PROVIDERS}
+
+
+def _build_client(provider: str) -> httpx.AsyncClient:
+    max_connections = _config(provider, "MAX_CONNECTIONS")
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            _config(provider, "TIMEOUT"), connect=_config(provider, "CONNECT_TIMEOUT")
+        ),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        follow_redirects=True,
+    )
+
+
+async def open_clients():
+    for provider in PROVIDERS:
+        if provider not in _clients:
+            _clients[provider] = _build_client(provider)
+
+
+async def close_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def get_client(provider: str) -> httpx.AsyncClient:
+    client = _clients.get(provider)
+    if client is None:
+        client = _clients[provider] = _build_client(provider)
+    return client
+
+
+def get_semaphore(provider: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(provider)
+    if semaphore is None:
+        semaphore = _semaphores[provider] = asyncio.Semaphore(CONCURRENCY[provider])
+    return semaphore
+
+
+def estatisticas() -> dict:
+    return {
+        provider: {
+            **_disjuntores[provider].estatisticas(),
+            "hedges": hedges[provider],
+        }
+        for provider in PROVIDERS
+    }
+
+
+async def fetch(
+    provider: str, url: str, method: str = "GET", **kwargs
+) -> httpx.Response:
+    # GETs idênticos em andamento compartilham a mesma resposta.
+    if method == "GET" and set(kwargs) <= {"params"}:
+        chave = (url, str(httpx.QueryParams(kwargs.get("params"))))
+        return await _voos[provider].executar(
+            chave, lambda: _requisitar(provider, url, method, **kwargs)
+        )
+    return await _requisitar(provider, url, method, **kwargs)
+
+
+async def _enviar(provider: str, url: str, method: str, **kwargs) -> httpx.Response:
+    bucket = _buckets.get(provider)
+    if bucket is not None:
+        await bucket.adquirir()
+    async with get_semaphore(provider):
+        inicio = time.perf_counter()
+        try:
+            response = await get_client(provider).request(method, url, **kwargs)
+        except httpx.HTTPError:
+            registrar_upstream(provider, time.perf_counter() - inicio, "erro")
+            raise
+        registrar_upstream(provider, time.perf_counter() - inicio, response.status_code)
+        return response
+
+
+async def _enviar_com_hedge(
+    provider: str, url: str, method: str, **kwargs
+) -> httpx.Response:
+    atraso = _config(provider, "HEDGE_SEGUNDOS")
+    if atraso is None or method != "GET":
+        return await _enviar(provider, url, method, **kwargs)
+    # Se a primeira tentativa demorar mais que o atraso configurado, uma
+    # segunda é disparada e vale a que terminar primeiro sem erro.
+    tarefas = {asyncio.create_task(_enviar(provider, url, method, **kwargs))}
+    try:
+        concluidas, _ = await asyncio.wait(tarefas, timeout=atraso)
+        if not concluidas:
+            hedges[provider] += 1
+            tarefas.add(asyncio.create_task(_enviar(provider, url, method, **kwargs)))
+        erro = None
+        while tarefas:
+            concluidas, tarefas = await asyncio.wait(
+                tarefas, return_when=asyncio.FIRST_COMPLETED
+            )
+            for tarefa in concluidas:
+                if tarefa.exception() is None:
+                    return tarefa.result()
+                erro = tarefa.exception()
+        raise erro
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+
+
+def _retry_after(response: httpx.Response) -> float:
+    valor = response.headers.get("Retry-After", "1")
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return 1.0
+    return max((data - datetime.now(UTC)).total_seconds(), 0.0)
+
+
+async def _requisitar(
+    provider: str, url: str, method: str = "GET", **kwargs
+) -> httpx.Response:
+    disjuntor = _disjuntores[provider]
+    try:
+        disjuntor.permitir()
+    except HTTPException:
+        registrar_erro_upstream(provider, "circuito_aberto")
+        raise
+    try:
+        response = await _enviar_com_hedge(provider, url, method, **kwargs)
+        if (
+            response.status_code == 429
+            and _retry_after(response) <= settings.HTTP_429_ESPERA_MAXIMA_SEGUNDOS
+        ):
+            await asyncio.sleep(_retry_after(response))
+            response = await _enviar_com_hedge(provider, url, method, **kwargs)
+    except httpx.TimeoutException:
+        disjuntor.registrar_falha()
+        registrar_erro_upstream(provider, "timeout")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Falha na API: Tempo esgotado ao consultar {provider}.",
+        )
+    except httpx.HTTPError as e:
+        disjuntor.registrar_falha()
+        registrar_erro_upstream(provider, "conexao")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Falha na API: Erro de conexão com {provider} - {type(e).__name__}.",
+        )
+    except BaseException:
+        disjuntor.liberar()
+        raise
+    if response.status_code >= 500:
+        disjuntor.registrar_falha()
+        registrar_erro_upstream(provider, "http_5xx")
+    elif response.status_code == 429:
+        disjuntor.liberar()
+        registrar_erro_upstream(provider, "http_429")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Falha na API: Limite de requisições de {provider} atingido.",
+            headers={"Retry-After": str(max(round(_retry_after(response)), 1))},
+        )
+    else:
+        disjuntor.registrar_sucesso()
+    return response
@@ -20,6 +20,56 @@ class APIConfiguration(BaseSettings):
     GEMINI_KEY: str
     GEMINI_MODEL: str
     PROMPT_BASE: str
+    GEMINI_BASE_URL: str | None = None
+    TOMTOM_ROUTING_URL: str = "https://api.tomtom.com/routing/1"
+    TOMTOM_MATRIX_URL: str = "https://api.tomtom.com/routing/matrix/2"
+    TOMTOM_MATRIX_MAX_CELULAS: int = 200
+
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    VIACEP_TIMEOUT: float = 10.0
+    VIACEP_MAX_CONNECTIONS: int = 100
+    LOCATIONIQ_TIMEOUT: float = 10.0
+    LOCATIONIQ_MAX_CONNECTIONS: int = 50
+    OVERPASS_TIMEOUT: float = 30.0
+    OVERPASS_MAX_CONNECTIONS: int = 10
+    TOMTOM_TIMEOUT: float = 15.0
+    TOMTOM_MAX_CONNECTIONS: int = 50
+    WEATHER_API_TIMEOUT: float = 10.0
+    WEATHER_API_MAX_CONNECTIONS: int = 50
+
+    VIACEP_CONCURRENCY: int = 20
+    LOCATIONIQ_CONCURRENCY: int = 10
+    OVERPASS_CONCURRENCY: int = 2
+    TOMTOM_CONCURRENCY: int = 20
+    WEATHER_API_CONCURRENCY: int = 20
+    GOOGLETRANS_CONCURRENCY: int = 10
+
+    VIACEP_CONNECT_TIMEOUT: float = 3.0
+    LOCATIONIQ_CONNECT_TIMEOUT: float = 3.0
+    OVERPASS_CONNECT_TIMEOUT: float = 5.0
+    TOMTOM_CONNECT_TIMEOUT: float = 3.0
+    WEATHER_API_CONNECT_TIMEOUT: float = 3.0
+
+    VIACEP_RATE_LIMIT: float | None = None
+    VIACEP_RATE_BURST: int = 1
+    LOCATIONIQ_RATE_LIMIT: float | None = 2.0
+    LOCATIONIQ_RATE_BURST: int = 2
+    OVERPASS_RATE_LIMIT: float | None = 1.0
+    OVERPASS_RATE_BURST: int = 2
+    TOMTOM_RATE_LIMIT: float | None = None
+    TOMTOM_RATE_BURST: int = 1
+    WEATHER_API_RATE_LIMIT: float | None = None
+    WEATHER_API_RATE_BURST: int = 1
+
+    VIACEP_HEDGE_SEGUNDOS: float | None = None
+    LOCATIONIQ_HEDGE_SEGUNDOS: float | None = None
+    OVERPASS_HEDGE_SEGUNDOS: float | None = None
+    TOMTOM_HEDGE_SEGUNDOS: float | None = None
+    WEATHER_API_HEDGE_SEGUNDOS: float | None = None
+
+    CIRCUIT_BREAKER_FALHAS: int = 5
+    CIRCUIT_BREAKER_ESPERA_SEGUNDOS: float = 30.0
+    HTTP_429_ESPERA_MAXIMA_SEGUNDOS: float = 2.0
 
 
 api_settings = APIConfiguration()
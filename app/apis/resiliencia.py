@@ -0,0 +1,78 @@
+import asyncio
+import time
+from math import ceil
+
+from fastapi import HTTPException, status
+
+
+class TokenBucket:
+    def __init__(self, taxa_por_segundo: float, capacidade: float):
+        self.taxa = taxa_por_segundo
+        self.capacidade = max(capacidade, 1.0)
+        self.tokens = self.capacidade
+        self.atualizado_em = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self):
+        # O lock mantém a ordem de chegada: quem espera um token não é
+        # ultrapassado por chamadas mais novas.
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self.tokens = min(
+                    self.capacidade,
+                    self.tokens + (agora - self.atualizado_em) * self.taxa,
+                )
+                self.atualizado_em = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.taxa)
+
+
+class CircuitBreaker:
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+
+    def __init__(self, provider: str, limite_falhas: int, espera_segundos: float):
+        self.provider = provider
+        self.limite_falhas = limite_falhas
+        self.espera_segundos = espera_segundos
+        self.estado = self.FECHADO
+        self.falhas = 0
+        self.aberto_em = 0.0
+        self._testando = False
+
+    def permitir(self):
+        if self.estado == self.FECHADO:
+            return
+        restante = self.espera_segundos - (time.monotonic() - self.aberto_em)
+        if self.estado == self.ABERTO and restante <= 0:
+            self.estado = self.MEIO_ABERTO
+        if self.estado == self.MEIO_ABERTO and not self._testando:
+            self._testando = True
+            return
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Falha na API: {self.provider} indisponível no momento.",
+            headers={"Retry-After": str(max(ceil(restante), 1))},
+        )
+
+    def registrar_sucesso(self):
+        self.estado = self.FECHADO
+        self.falhas = 0
+        self._testando = False
+
+    def liberar(self):
+        self._testando = False
+
+    def registrar_falha(self):
+        self.falhas += 1
+        if self.estado == self.MEIO_ABERTO or self.falhas >= self.limite_falhas:
+            self.estado = self.ABERTO
+            self.aberto_em = time.monotonic()
+        self._testando = False
+
+    def estatisticas(self) -> dict:
+        return {"estado": self.estado, "falhas_consecutivas": self.falhas}
@@ -0,0 +1,36 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+_grupos: dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.chamadas = 0
+        self.coalescidas = 0
+        self._em_andamento: dict[Hashable, asyncio.Task] = {}
+        _grupos[nome] = self
+
+    async def executar(self, chave: Hashable, funcao: Callable[[], Awaitable]):
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is None:
+            self.chamadas += 1
+            tarefa = asyncio.create_task(funcao())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._em_andamento.pop(chave, None))
+        else:
+            self.coalescidas += 1
+        # shield: se quem iniciou a chamada desistir, as demais seguem esperando.
+        return await asyncio.shield(tarefa)
+
+    def estatisticas(self) -> dict:
+        return {
+            "chamadas": self.chamadas,
+            "coalescidas": self.coalescidas,
+            "em_andamento": len(self._em_andamento),
+        }
+
+
+def estatisticas() -> dict:
+    return {nome: grupo.estatisticas() for nome, grupo in _grupos.items()}
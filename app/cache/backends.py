@@ -0,0 +1,164 @@
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from .config import cache_settings as settings
+
+
+class MemoryBackend:
+    nome = "memoria"
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._entradas: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._bytes = 0
+
+    async def get(self, chave: str) -> str | None:
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+        expira_em, valor = entrada
+        if expira_em < time.monotonic():
+            self._remover(chave)
+            return None
+        self._entradas.move_to_end(chave)
+        return valor
+
+    async def get_many(self, chaves: list[str]) -> list[str | None]:
+        return [await self.get(chave) for chave in chaves]
+
+    async def set(self, chave: str, valor: str, ttl: int):
+        if chave in self._entradas:
+            self._remover(chave)
+        self._entradas[chave] = (time.monotonic() + ttl, valor)
+        self._bytes += len(valor)
+        while len(self._entradas) > self.max_entradas:
+            self._remover(next(iter(self._entradas)))
+
+    async def delete(self, chave: str):
+        if chave in self._entradas:
+            self._remover(chave)
+
+    async def estatisticas(self) -> dict:
+        return {"entradas": len(self._entradas), "bytes": self._bytes}
+
+    async def close(self):
+        self._entradas.clear()
+        self._bytes = 0
+
+    def _remover(self, chave: str):
+        _, valor = self._entradas.pop(chave)
+        self._bytes -= len(valor)
+
+
+class PostgresBackend:
+    nome = "postgres"
+    limpeza_a_cada = 1000
+
+    def __init__(self):
+        from app.database.models import CacheEntrada
+        from app.database.session import async_session
+
+        self.model = CacheEntrada
+        self.async_session = async_session
+        self._escritas = 0
+
+    async def get(self, chave: str) -> str | None:
+        async with self.async_session() as session:
+            resultado = await session.execute(
+                select(self.model.valor).where(
+                    self.model.chave == chave,
+                    self.model.expira_em > datetime.now(UTC),
+                )
+            )
+            return resultado.scalar_one_or_none()
+
+    async def get_many(self, chaves: list[str]) -> list[str | None]:
+        async with self.async_session() as session:
+            resultado = await session.execute(
+                select(self.model.chave, self.model.valor).where(
+                    self.model.chave.in_(chaves),
+                    self.model.expira_em > datetime.now(UTC),
+                )
+            )
+            valores = dict(resultado.all())
+        return [valores.get(chave) for chave in chaves]
+
+    async def set(self, chave: str, valor: str, ttl: int):
+        expira_em = datetime.now(UTC) + timedelta(seconds=ttl)
+        comando = insert(self.model).values(
+            chave=chave, valor=valor, expira_em=expira_em
+        )
+        comando = comando.on_conflict_do_update(
+            index_elements=[self.model.chave],
+            set_={"valor": valor, "expira_em": expira_em},
+        )
+        async with self.async_session() as session:
+            await session.execute(comando)
+            self._escritas += 1
+            if self._escritas % self.limpeza_a_cada == 0:
+                await session.execute(
+                    delete(self.model).where(self.model.expira_em <= datetime.now(UTC))
+                )
+            await session.commit()
+
+    async def delete(self, chave: str):
+        async with self.async_session() as session:
+            await session.execute(delete(self.model).where(self.model.chave == chave))
+            await session.commit()
+
+    async def estatisticas(self) -> dict:
+        async with self.async_session() as session:
+            resultado = await session.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.sum(func.length(self.model.valor)), 0),
+                )
+            )
+            entradas, tamanho = resultado.one()
+        return {"entradas": entradas, "bytes": int(tamanho)}
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    nome = "redis"
+
+    def __init__(self, url: str):
+        from redis import asyncio as redis
+
+        self.redis = redis.from_url(url, decode_responses=True)
+
+    async def get(self, chave: str) -> str | None:
+        return await self.redis.get(chave)
+
+    async def get_many(self, chaves: list[str]) -> list[str | None]:
+        return await self.redis.mget(chaves)
+
+    async def set(self, chave: str, valor: str, ttl: int):
+        await self.redis.set(chave, valor, ex=ttl)
+
+    async def delete(self, chave: str):
+        await self.redis.delete(chave)
+
+    async def estatisticas(self) -> dict:
+        memoria = await self.redis.info("memory")
+        return {
+            "entradas": await self.redis.dbsize(),
+            "bytes": memoria.get("used_memory"),
+        }
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_backend():
+    if settings.CACHE_BACKEND == "postgres":
+        return PostgresBackend()
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend(settings.CACHE_REDIS_URL)
+    return MemoryBackend(settings.CACHE_MAX_ENTRADAS)
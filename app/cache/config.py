@@ -0,0 +1,34 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+_base_config = SettingsConfigDict(
+    env_file="./.env", extra="ignore", env_ignore_empty=True
+)
+
+
+class CacheSettings(BaseSettings):
+    model_config = _base_config
+    CACHE_BACKEND: str = "memoria"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_MAX_ENTRADAS: int = 50_000
+    CACHE_CEP_TTL: int = 30 * 24 * 3600
+    CACHE_CEP_TTL_NEGATIVO: int = 3600
+    CACHE_GEOCODIFICACAO_TTL: int = 30 * 24 * 3600
+    CACHE_GEOCODIFICACAO_TTL_NEGATIVO: int = 3600
+    CACHE_INSIGHTS_TTL: int = 7 * 24 * 3600
+    CACHE_REVERSA_TTL: int = 7 * 24 * 3600
+    CACHE_REVERSA_CELULA_GRAUS: float = 0.001
+    CACHE_REVERSA_RAIO_METROS: float = 50.0
+    CACHE_REVERSA_MAX_POR_CELULA: int = 16
+    CACHE_POI_TTL: int = 7 * 24 * 3600
+    CACHE_POI_TILE_GRAUS: float = 0.01
+    CACHE_POI_MAX_TILES: int = 64
+    CACHE_POI_TILES_EM_MEMORIA: int = 512
+    CACHE_TRAFEGO_TTL: int = 60
+    CACHE_TRAFEGO_TILE_GRAUS: float = 0.01
+    CACHE_TRAFEGO_PONTO_GRAUS: float = 0.0005
+    CACHE_CLIMA_TTL: int = 3 * 3600
+    CACHE_CLIMA_CELULA_GRAUS: float = 0.1
+
+
+cache_settings = CacheSettings()
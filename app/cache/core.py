@@ -0,0 +1,121 @@
+import json
+import logging
+from datetime import UTC, datetime
+
+from .backends import create_backend
+
+logger = logging.getLogger(__name__)
+
+_backend = None
+_caches: dict[str, "Cache"] = {}
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+async def open_cache():
+    get_backend()
+
+
+async def close_cache():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+def agora_iso() -> str:
+    return datetime.now(UTC).isoformat(timespec="seconds")
+
+
+class Cache:
+    def __init__(self, namespace: str, ttl: int, ttl_negativo: int | None = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo if ttl_negativo is not None else ttl
+        self.acertos = 0
+        self.acertos_negativos = 0
+        self.falhas = 0
+        _caches[namespace] = self
+
+    def _chave(self, chave: str) -> str:
+        return f"{self.namespace}:{chave}"
+
+    async def _ler_entrada(self, chave: str) -> dict | None:
+        try:
+            valor = await get_backend().get(self._chave(chave))
+        except Exception:
+            # O cache é só um atalho: com o backend fora do ar, a consulta
+            # segue como uma falha e vai à fonte dos dados.
+            logger.exception("Falha ao ler %s do cache", self._chave(chave))
+            valor = None
+        if valor is None:
+            self.falhas += 1
+            return None
+        entrada = json.loads(valor)
+        if entrada["negativo"]:
+            self.acertos_negativos += 1
+        else:
+            self.acertos += 1
+        return entrada
+
+    async def get(self, chave: str) -> tuple[bool, object]:
+        entrada = await self._ler_entrada(chave)
+        if entrada is None:
+            return False, None
+        return True, entrada["valor"]
+
+    async def get_com_horario(self, chave: str) -> tuple[bool, object, str | None]:
+        # Também devolve quando o valor foi gravado, para quem precisa informar
+        # a idade do dado; entradas antigas, sem o horário, devolvem None.
+        entrada = await self._ler_entrada(chave)
+        if entrada is None:
+            return False, None, None
+        return True, entrada["valor"], entrada.get("gravado_em")
+
+    async def set(
+        self, chave: str, valor, negativo: bool = False, gravado_em: str | None = None
+    ):
+        entrada = json.dumps(
+            {
+                "negativo": negativo,
+                "valor": valor,
+                "gravado_em": gravado_em or agora_iso(),
+            },
+            ensure_ascii=False,
+        )
+        try:
+            await get_backend().set(
+                self._chave(chave), entrada, self.ttl_negativo if negativo else self.ttl
+            )
+        except Exception:
+            logger.exception("Falha ao gravar %s no cache", self._chave(chave))
+
+    async def delete(self, chave: str):
+        await get_backend().delete(self._chave(chave))
+
+    def estatisticas(self) -> dict:
+        consultas = self.acertos + self.acertos_negativos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "acertos_negativos": self.acertos_negativos,
+            "falhas": self.falhas,
+            "taxa_de_acerto": round(
+                (self.acertos + self.acertos_negativos) / consultas, 4
+            )
+            if consultas
+            else 0.0,
+        }
+
+
+async def estatisticas() -> dict:
+    backend = get_backend()
+    return {
+        "backend": backend.nome,
+        "armazenamento": await backend.estatisticas(),
+        "caches": {nome: cache.estatisticas() for nome, cache in _caches.items()},
+    }
@@ -0,0 +1,74 @@
+import json
+import logging
+from math import ceil, cos, floor, isqrt, radians
+
+from app.utils import distancia_haversine
+
+from .core import Cache, get_backend
+
+logger = logging.getLogger(__name__)
+
+METROS_POR_GRAU = 111_320
+
+
+# Cada célula é dividida em até max_por_celula posições, e cada posição guarda
+# uma única entrada na própria chave. Assim, gravar é uma escrita só, sem ler a
+# célula antes, e gravações simultâneas não apagam as entradas umas das outras;
+# duas gravações na mesma posição, a poucos metros uma da outra, ficam com a
+# mais recente.
+class SpatialCache(Cache):
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int,
+        celula_graus: float,
+        raio_metros: float,
+        max_por_celula: int,
+    ):
+        super().__init__(namespace, ttl)
+        self.celula_graus = celula_graus
+        self.raio_metros = raio_metros
+        self.max_por_celula = max_por_celula
+        self.posicao_graus = celula_graus / max(isqrt(max_por_celula), 1)
+
+    def _posicao(self, lat: float, lon: float) -> tuple[int, int]:
+        return floor(lat / self.posicao_graus), floor(lon / self.posicao_graus)
+
+    def _vizinhas(self, lat: float, lon: float) -> list[tuple[int, int]]:
+        linha, coluna = self._posicao(lat, lon)
+        tamanho_metros = self.posicao_graus * METROS_POR_GRAU
+        alcance_lat = ceil(self.raio_metros / tamanho_metros)
+        alcance_lon = ceil(
+            self.raio_metros / max(tamanho_metros * cos(radians(lat)), 1.0)
+        )
+        return [
+            (linha + i, coluna + j)
+            for i in range(-alcance_lat, alcance_lat + 1)
+            for j in range(-alcance_lon, alcance_lon + 1)
+        ]
+
+    async def _ler_posicoes(self, posicoes: list[tuple[int, int]]) -> list[dict]:
+        chaves = [self._chave(f"{linha}:{coluna}") for linha, coluna in posicoes]
+        try:
+            valores = await get_backend().get_many(chaves)
+        except Exception:
+            logger.exception("Falha ao ler o cache espacial %s", self.namespace)
+            return []
+        return [json.loads(valor)["valor"] for valor in valores if valor]
+
+    async def buscar(self, lat: float, lon: float):
+        entradas = await self._ler_posicoes(self._vizinhas(lat, lon))
+        mais_proximo, menor_distancia = None, self.raio_metros
+        for entrada in entradas:
+            distancia = distancia_haversine(lat, lon, entrada["lat"], entrada["lon"])
+            if distancia <= menor_distancia:
+                mais_proximo, menor_distancia = entrada, distancia
+        if mais_proximo is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        return mais_proximo["valor"]
+
+    async def guardar(self, lat: float, lon: float, valor):
+        linha, coluna = self._posicao(lat, lon)
+        await self.set(f"{linha}:{coluna}", {"lat": lat, "lon": lon, "valor": valor})
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import OrderedDict
+from math import cos, floor, radians
+from collections.abc import Awaitable, Callable
+
+import numpy as np
+
+from app.utils import distancias_ate
+
+from .core import Cache
+from .spatial import METROS_POR_GRAU
+
+BuscarTile = Callable[[float, float, float, float], Awaitable[list[dict]]]
+
+
+class TileCache(Cache):
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int,
+        tile_graus: float,
+        max_tiles: int,
+        max_em_memoria: int,
+    ):
+        super().__init__(namespace, ttl)
+        self.tile_graus = tile_graus
+        self.max_tiles = max_tiles
+        self.max_em_memoria = max_em_memoria
+        self._decodificados: OrderedDict[tuple[int, int], tuple] = OrderedDict()
+
+    def tiles(self, lat: float, lon: float, raio_metros: float):
+        delta_lat = raio_metros / METROS_POR_GRAU
+        delta_lon = raio_metros / max(METROS_POR_GRAU * cos(radians(lat)), 1.0)
+        return [
+            (linha, coluna)
+            for linha in range(
+                floor((lat - delta_lat) / self.tile_graus),
+                floor((lat + delta_lat) / self.tile_graus) + 1,
+            )
+            for coluna in range(
+                floor((lon - delta_lon) / self.tile_graus),
+                floor((lon + delta_lon) / self.tile_graus) + 1,
+            )
+        ]
+
+    def limites(self, tile: tuple[int, int]) -> tuple[float, float, float, float]:
+        linha, coluna = tile
+        return (
+            round(linha * self.tile_graus, 6),
+            round(coluna * self.tile_graus, 6),
+            round((linha + 1) * self.tile_graus, 6),
+            round((coluna + 1) * self.tile_graus, 6),
+        )
+
+    def _indexar(self, tile: tuple[int, int], obtido_em: float, elementos: list):
+        elementos = [e for e in elementos if "lat" in e and "lon" in e]
+        indexado = (
+            obtido_em + self.ttl,
+            np.fromiter((e["lat"] for e in elementos), np.float64, len(elementos)),
+            np.fromiter((e["lon"] for e in elementos), np.float64, len(elementos)),
+            elementos,
+        )
+        self._decodificados[tile] = indexado
+        self._decodificados.move_to_end(tile)
+        while len(self._decodificados) > self.max_em_memoria:
+            self._decodificados.popitem(last=False)
+        return indexado
+
+    async def _carregar(self, tile: tuple[int, int], buscar_tile: BuscarTile):
+        indexado = self._decodificados.get(tile)
+        if indexado is not None and indexado[0] > time.time():
+            self._decodificados.move_to_end(tile)
+            self.acertos += 1
+            return indexado
+        chave = f"{tile[0]}:{tile[1]}"
+        encontrado, valor = await self.get(chave)
+        if not encontrado:
+            valor = {
+                "obtido_em": time.time(),
+                "elementos": await buscar_tile(*self.limites(tile)),
+            }
+            await self.set(chave, valor)
+        return self._indexar(tile, valor["obtido_em"], valor["elementos"])
+
+    async def buscar(
+        self, lat: float, lon: float, raio_metros: float, buscar_tile: BuscarTile
+    ) -> list[dict] | None:
+        tiles = self.tiles(lat, lon, raio_metros)
+        if len(tiles) > self.max_tiles:
+            return None
+        carregados = await asyncio.gather(
+            *(self._carregar(tile, buscar_tile) for tile in tiles)
+        )
+        encontrados = {}
+        for _, lats, lons, elementos in carregados:
+            if not elementos:
+                continue
+            distancias = distancias_ate(lat, lon, lats, lons)
+            for i in np.flatnonzero(distancias <= raio_metros):
+                encontrados[(elementos[i]["type"], elementos[i]["id"])] = elementos[i]
+        return [encontrados[chave] for chave in sorted(encontrados)]
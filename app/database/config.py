@@ -9,6 +9,8 @@ _base_config = SettingsConfigDict(
 class DatabaseSettings(BaseSettings):
     model_config = _base_config
     DATABASE_URL: str
+    TRAJETO_COMPRESSAO_ATIVA: bool = True
+    TRAJETO_COMPRESSAO_MIN_BYTES: int = 8192
 
 
 database_settings = DatabaseSettings()
@@ -1,13 +1,51 @@
+from datetime import datetime
 from uuid import UUID, uuid4
-from sqlalchemy import Column
+from sqlalchemy import Column, DateTime, LargeBinary
 from sqlmodel import JSON, Field, SQLModel
 from sqlalchemy.dialects import postgresql
 
 
 class Trajeto(SQLModel, table=True):
     id: UUID = Field(
-        sa_column=Column(postgresql.UUID, default=uuid4(), primary_key=True, index=True)
+        sa_column=Column(postgresql.UUID, default=uuid4, primary_key=True, index=True)
     )
     senha: str
-    dados_trajeto: dict = Field(default_factory=dict, sa_column=Column(JSON))
-    insights: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    dados_trajeto: dict | None = Field(
+        default=None, sa_column=Column(postgresql.JSONB(none_as_null=True))
+    )
+    dados_trajeto_comprimido: bytes | None = Field(
+        default=None, sa_column=Column(LargeBinary)
+    )
+    insights: dict | None = Field(
+        default=None, sa_column=Column(postgresql.JSONB(none_as_null=True))
+    )
+
+
+class CacheEntrada(SQLModel, table=True):
+    chave: str = Field(primary_key=True)
+    valor: str
+    expira_em: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True)
+    )
+
+
+class TrabalhoTrajeto(SQLModel, table=True):
+    id: UUID = Field(
+        sa_column=Column(postgresql.UUID(as_uuid=True), default=uuid4, primary_key=True)
+    )
+    status: str = Field(default="pendente", index=True)
+    parametros: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    senha: str
+    tentativas: int = 0
+    trechos_concluidos: int = 0
+    total_trechos: int | None = None
+    erro: str | None = None
+    criado_em: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True)
+    )
+    atualizado_em: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+    disponivel_em: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
@@ -1,16 +1,63 @@
+import time
+from sqlalchemy import event, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlmodel import SQLModel
+from app.metricas import registrar_etapa
 from .config import database_settings as settings
 
 engine = create_async_engine(url=settings.DATABASE_URL)
 
 
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info["inicio_consultas"].pop()
+    registrar_etapa("banco", time.perf_counter() - inicio)
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _erro_na_consulta(contexto):
+    inicios = (
+        contexto.connection.info.get("inicio_consultas")
+        if contexto.connection
+        else None
+    )
+    if inicios:
+        registrar_etapa("banco", time.perf_counter() - inicios.pop(), erro=True)
+
+
+_migracoes = [
+    "ALTER TABLE trajeto ADD COLUMN IF NOT EXISTS dados_trajeto_comprimido BYTEA",
+    "ALTER TABLE trabalhotrajeto ADD COLUMN IF NOT EXISTS disponivel_em TIMESTAMPTZ",
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'trajeto' AND column_name = 'dados_trajeto'
+            AND data_type = 'json'
+        ) THEN
+            ALTER TABLE trajeto
+                ALTER COLUMN dados_trajeto TYPE JSONB USING dados_trajeto::jsonb,
+                ALTER COLUMN insights TYPE JSONB USING insights::jsonb;
+        END IF;
+    END $$
+    """,
+]
+
+
 async def create_db_tables():
     async with engine.begin() as conn:
-        from .models import Trajeto  # noqa: F401
+        from .models import CacheEntrada, TrabalhoTrajeto, Trajeto  # noqa: F401
 
         await conn.run_sync(SQLModel.metadata.create_all)
+        for migracao in _migracoes:
+            await conn.execute(text(migracao))
 
 
 async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
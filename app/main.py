@@ -1,12 +1,25 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
+from .admissao import AdmissaoMiddleware
+from .apis.clients import close_clients, open_clients
+from .cache.core import close_cache, open_cache
 from .database.session import create_db_tables
-from .routers import cep, insights, trajeto
+from .metricas import ServerTimingMiddleware
+from .respostas import CompressaoMiddleware
+from .routers import cache, cep, insights, metricas, trajeto
+from .services.trabalhos import fila_trabalhos
 
 
 async def lifespan_handler(app: FastAPI):
     await create_db_tables()
+    await open_clients()
+    await open_cache()
+    fila_trabalhos.start()
     yield
+    await fila_trabalhos.stop()
+    await close_clients()
+    await close_cache()
 
 
 description = """
@@ -27,8 +40,15 @@ app = FastAPI(
     title="RotaJá API",
     version="1.0.0",
     description=description,
+    default_response_class=ORJSONResponse,
 )
 
 app.include_router(cep.router)
 app.include_router(trajeto.router)
 app.include_router(insights.router)
+app.include_router(cache.router)
+app.include_router(metricas.router)
+
+app.add_middleware(AdmissaoMiddleware)
+app.add_middleware(CompressaoMiddleware)
+app.add_middleware(ServerTimingMiddleware)
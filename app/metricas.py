@@ -0,0 +1,212 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_tempos_da_requisicao: ContextVar[dict | None] = ContextVar(
+    "tempos_da_requisicao", default=None
+)
+
+
+class Histograma:
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES_SEGUNDOS) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(LIMITES_SEGUNDOS, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class Metrica:
+    def __init__(self, nome: str, tipo: str, descricao: str):
+        self.nome = nome
+        self.tipo = tipo
+        self.descricao = descricao
+        self.series: dict[tuple, Histograma | float] = {}
+
+    def observar(self, valor: float, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        serie = self.series.get(chave)
+        if serie is None:
+            serie = self.series[chave] = Histograma()
+        serie.observar(valor)
+
+    def incrementar(self, valor: float = 1, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        self.series[chave] = self.series.get(chave, 0) + valor
+
+    def definir(self, valor: float, **rotulos):
+        self.series[tuple(sorted(rotulos.items()))] = valor
+
+
+_metricas: dict[str, Metrica] = {}
+
+
+def _metrica(nome: str, tipo: str, descricao: str) -> Metrica:
+    metrica = _metricas[nome] = Metrica(nome, tipo, descricao)
+    return metrica
+
+
+etapas = _metrica(
+    "rotaja_etapa_duracao_segundos",
+    "histogram",
+    "Duração de cada etapa do processamento.",
+)
+etapas_erros = _metrica(
+    "rotaja_etapa_erros_total", "counter", "Etapas encerradas com erro."
+)
+upstream = _metrica(
+    "rotaja_upstream_duracao_segundos",
+    "histogram",
+    "Duração das chamadas HTTP às APIs de apoio, por provedor e status.",
+)
+upstream_erros = _metrica(
+    "rotaja_upstream_erros_total",
+    "counter",
+    "Falhas nas chamadas às APIs de apoio, por provedor e tipo.",
+)
+requisicoes = _metrica(
+    "rotaja_requisicao_duracao_segundos",
+    "histogram",
+    "Duração das requisições recebidas, por rota e status.",
+)
+
+
+def _registrar_tempo(etapa: str, duracao: float):
+    tempos = _tempos_da_requisicao.get()
+    if tempos is not None:
+        fim = time.perf_counter()
+        tempos.setdefault(etapa, []).append((fim - duracao, fim))
+
+
+def _tempo_de_parede(intervalos: list[tuple[float, float]]) -> float:
+    # Chamadas concorrentes da mesma etapa se sobrepõem; o Server-Timing
+    # mostra por quanto tempo a etapa esteve em andamento, não a soma.
+    total, fim_atual = 0.0, float("-inf")
+    for inicio, fim in sorted(intervalos):
+        if fim <= fim_atual:
+            continue
+        total += fim - max(inicio, fim_atual)
+        fim_atual = fim
+    return total
+
+
+def registrar_etapa(etapa: str, duracao: float, erro: bool = False):
+    etapas.observar(duracao, etapa=etapa)
+    if erro:
+        etapas_erros.incrementar(etapa=etapa)
+    _registrar_tempo(etapa, duracao)
+
+
+@contextmanager
+def medir(etapa: str):
+    inicio = time.perf_counter()
+    erro = False
+    try:
+        yield
+    except BaseException:
+        erro = True
+        raise
+    finally:
+        registrar_etapa(etapa, time.perf_counter() - inicio, erro)
+
+
+def medido(etapa: str):
+    def decorador(funcao):
+        @wraps(funcao)
+        async def medida(*args, **kwargs):
+            with medir(etapa):
+                return await funcao(*args, **kwargs)
+
+        return medida
+
+    return decorador
+
+
+def registrar_upstream(provider: str, duracao: float, status: int | str):
+    upstream.observar(duracao, provider=provider, status=str(status))
+    _registrar_tempo(f"api_{provider}", duracao)
+
+
+def registrar_erro_upstream(provider: str, tipo: str):
+    upstream_erros.incrementar(provider=provider, tipo=tipo)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(chave: tuple, *extras: tuple[str, str]) -> str:
+    pares = [*chave, *extras]
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+def exportar(extras: list[Metrica] = ()) -> str:
+    linhas = []
+    for metrica in [*_metricas.values(), *extras]:
+        linhas.append(f"# HELP {metrica.nome} {metrica.descricao}")
+        linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+        for chave, serie in metrica.series.items():
+            if isinstance(serie, Histograma):
+                acumulado = 0
+                for limite, contagem in zip(LIMITES_SEGUNDOS, serie.contagens):
+                    acumulado += contagem
+                    linhas.append(
+                        f"{metrica.nome}_bucket{_rotulos(chave, ('le', limite))} {acumulado}"
+                    )
+                linhas.append(
+                    f"{metrica.nome}_bucket{_rotulos(chave, ('le', '+Inf'))} {serie.total}"
+                )
+                linhas.append(f"{metrica.nome}_sum{_rotulos(chave)} {serie.soma}")
+                linhas.append(f"{metrica.nome}_count{_rotulos(chave)} {serie.total}")
+            else:
+                linhas.append(f"{metrica.nome}{_rotulos(chave)} {serie}")
+    return "\n".join(linhas) + "\n"
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        inicio = time.perf_counter()
+        tempos = {}
+        token = _tempos_da_requisicao.set(tempos)
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                valores = [
+                    f'{etapa};dur={_tempo_de_parede(intervalos) * 1000:.1f};desc="{len(intervalos)}"'
+                    for etapa, intervalos in tempos.items()
+                ]
+                valores.append(f"total;dur={(time.perf_counter() - inicio) * 1000:.1f}")
+                mensagem["headers"] = [
+                    *mensagem.get("headers", []),
+                    (b"server-timing", ", ".join(valores).encode()),
+                ]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _tempos_da_requisicao.reset(token)
+            rota = scope.get("route")
+            requisicoes.observar(
+                time.perf_counter() - inicio,
+                metodo=scope["method"],
+                rota=getattr(rota, "path", "desconhecida"),
+                status=str(status),
+            )
@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+
+import orjson
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.metricas import medir
+from app.services.config import service_settings
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele, apenas gzip é negociado
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = ("application/json", "application/problem+json", "text/")
+
+
+def _codificacoes_aceitas(accept_encoding: str) -> dict[str, float]:
+    aceitas = {}
+    for item in accept_encoding.split(","):
+        nome, _, parametros = item.strip().partition(";")
+        peso = 1.0
+        parametro = parametros.strip()
+        if parametro.startswith("q="):
+            try:
+                peso = float(parametro[2:])
+            except ValueError:
+                peso = 0.0
+        if nome:
+            aceitas[nome.strip().lower()] = peso
+    return aceitas
+
+
+def escolher_codificacao(accept_encoding: str) -> str | None:
+    aceitas = _codificacoes_aceitas(accept_encoding)
+    disponiveis = ("br", "gzip") if brotli is not None else ("gzip",)
+    candidatas = [
+        (aceitas.get(nome, aceitas.get("*", 0.0)), -ordem, nome)
+        for ordem, nome in enumerate(disponiveis)
+    ]
+    peso, _, nome = max(candidatas)
+    return nome if peso > 0 else None
+
+
+def comprimir(corpo: bytes, codificacao: str) -> bytes:
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=service_settings.COMPRESSAO_NIVEL_BROTLI)
+    return gzip.compress(
+        corpo, compresslevel=service_settings.COMPRESSAO_NIVEL_GZIP, mtime=0
+    )
+
+
+# Só respostas completas são comprimidas: as transmitidas em partes (NDJSON,
+# SSE, texto da IA) passam sem alteração para cada evento chegar assim que
+# é gerado.
+class CompressaoMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        codificacao = escolher_codificacao(
+            Headers(scope=scope).get("accept-encoding", "")
+        )
+        inicio = None
+
+        async def enviar(mensagem):
+            nonlocal inicio
+            if mensagem["type"] == "http.response.start":
+                inicio = mensagem
+                return
+            if inicio is None or mensagem["type"] != "http.response.body":
+                return await send(mensagem)
+            mensagem_inicial, inicio = inicio, None
+            cabecalhos = MutableHeaders(raw=mensagem_inicial.setdefault("headers", []))
+            corpo = mensagem.get("body", b"")
+            if (
+                mensagem.get("more_body")
+                or "content-encoding" in cabecalhos
+                or not cabecalhos.get("content-type", "").startswith(TIPOS_COMPRIMIVEIS)
+            ):
+                await send(mensagem_inicial)
+                return await send(mensagem)
+            cabecalhos.add_vary_header("Accept-Encoding")
+            if codificacao and len(corpo) >= service_settings.COMPRESSAO_TAMANHO_MINIMO:
+                with medir("compressao"):
+                    corpo = comprimir(corpo, codificacao)
+                cabecalhos["content-encoding"] = codificacao
+                cabecalhos["content-length"] = str(len(corpo))
+            await send(mensagem_inicial)
+            await send({**mensagem, "body": corpo})
+
+        await self.app(scope, receive, enviar)
+
+
+def _etag_corresponde(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidata.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for candidata in if_none_match.split(",")
+    )
+
+
+def resposta_condicional(request: Request, conteudo) -> Response:
+    corpo = orjson.dumps(conteudo, option=orjson.OPT_SERIALIZE_NUMPY)
+    etag = f'W/"{hashlib.blake2b(corpo, digest_size=16).hexdigest()}"'
+    cabecalhos = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_corresponde(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(corpo, media_type="application/json", headers=cabecalhos)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from app.apis import singleflight
+from app.cache.core import estatisticas
+
+router = APIRouter(tags=["Cache"], prefix="/cache")
+
+
+@router.get("/estatisticas")
+async def estatisticas_cache():
+    return {
+        **await estatisticas(),
+        "chamadas_coalescidas": singleflight.estatisticas(),
+    }
@@ -1,157 +1,121 @@
-from math import ceil
-from fastapi import HTTPException, Query, status, APIRouter
-import requests
+import json
+from fastapi import HTTPException, Query, Request, status, APIRouter
+from fastapi.responses import StreamingResponse
 
-from ..apis.config import api_settings as settings
+from app.admissao import admissao
+from app.services import cep as cep_service
+from app.services.config import service_settings
+from app.utils import normalizar_cep
 
 router = APIRouter(tags=["CEP"], prefix="/cep")
 
 
 @router.get("/buscar/{cep}")
 async def buscar_cep(cep: str):
-    response = requests.get(f"{settings.VIACEP_URL}/{cep}/json/")
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Falha na API: Erro ao buscar CEP - {response.status_code}.",
-        )
+    return await cep_service.buscar_cep(cep)
 
 
 @router.get("/formatar/{cep}")
 async def formatar_cep(cep: str, numero: str = Query(None)):
-    response = requests.get(f"{settings.VIACEP_URL}/{cep}/json/")
-    if response.status_code == 200:
-        endereco_completo = response.json()
-        logradouro = endereco_completo.get("logradouro")
-        bairro = endereco_completo.get("bairro")
-        cidade = endereco_completo.get("localidade")
-        estado = endereco_completo.get("uf")
-        endereco_formatado = f"{logradouro}"
-        if numero:
-            endereco_formatado += f", {numero}"
-        endereco_formatado += f", {bairro}, {cidade} - {estado}, Brasil"
-        return endereco_formatado
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Falha na API: Erro ao obter endereço - {response.status_code}.",
-        )
+    return await cep_service.formatar_cep(cep, numero)
 
 
-@router.get("/coordenadas/{cep}")
+@router.get("/coordenadas/{cep}", dependencies=[admissao("consulta")])
 async def obter_coordenadas(cep: str, numero: str = Query(None)):
-    endereco_completo = await formatar_cep(cep, numero)
-    response = requests.get(
-        f"{settings.LOCATIONIQ_URL}&q={endereco_completo}&format=json"
-    )
-    if response.status_code == 200:
-        coordenadas = response.json()
-        lat = coordenadas[0].get("lat")
-        lon = coordenadas[0].get("lon")
-        location_class = coordenadas[0].get("class")
-        address_type = coordenadas[0].get("type")
-        display_name = coordenadas[0].get("display_name")
-        bounding_box = coordenadas[0].get("boundingbox")
-
-        return {
-            "lat": lat,
-            "lon": lon,
-            "display_name": display_name,
-            "class": location_class,
-            "type": address_type,
-            "bounding_box": bounding_box,
-        }
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Falha na API: Erro ao obter coordenadas - {response.status_code}.",
-        )
+    return await cep_service.obter_coordenadas(cep, numero)
 
 
-@router.get("/referencias/{cep}")
+@router.get("/referencias/{cep}", dependencies=[admissao("consulta", custo=2)])
 async def pontos_de_referencia(
     cep: str, raio_em_metros: float = 300, numero: str = Query(None)
 ):
-    coordenadas = await obter_coordenadas(cep, numero)
-    longitude, latitude = coordenadas["lon"], coordenadas["lat"]
-    response = requests.get(
-        f"{settings.OVERPASS_URL}{raio_em_metros},{latitude},{longitude});out;"
+    coordenadas = await cep_service.obter_coordenadas(cep, numero)
+    return await cep_service.pontos_de_referencia(
+        coordenadas["lat"], coordenadas["lon"], raio_em_metros
     )
-    if response.status_code == 200:
-        referencias = response.json()
-        return [element for element in referencias["elements"]]
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Falha na API: Erro ao obter pontos de referência - {response.status_code}.",
-        )
 
 
-@router.get("/trafego/{cep}")
+@router.get("/trafego/{cep}", dependencies=[admissao("consulta", custo=2)])
 async def retornar_trafego(cep: str):
-    coordenadas = await obter_coordenadas(cep, numero=None)
-
-    longitude, latitude = coordenadas["lon"], coordenadas["lat"]
-    minY = coordenadas["bounding_box"][0]
-    maxY = coordenadas["bounding_box"][1]
-    minX = coordenadas["bounding_box"][2]
-    maxX = coordenadas["bounding_box"][3]
-    boundingBox = f"{minY},{maxY},{minX},{maxX}"
-    incidentes = requests.get(
-        f"{settings.TOMTOM_URL}/incidentViewport/{boundingBox}/0/{boundingBox}/22/true/json?key={settings.TOMTOM_KEY}"
-    )
-    congestionamento = requests.get(
-        f"{settings.TOMTOM_URL}/flowSegmentData/absolute/10/json?point={latitude},{longitude}&unit=KMPH&fields=currentSpeed,freeFlowSpeed,confidence&key={settings.TOMTOM_KEY}"
+    coordenadas = await cep_service.obter_coordenadas(cep)
+    return await cep_service.trafego(
+        coordenadas["lat"], coordenadas["lon"], coordenadas["bounding_box"]
     )
-    if incidentes.status_code == 200:
-        incidentes = incidentes.json()
-
-        lista_incidentes = incidentes["viewpResp"]["trafficState"].get("incidents", [])
-        dados_incidentes = {
-            "idade_das_informacoes_segundos": incidentes["viewpResp"][
-                "trafficState"
-            ].get("@trafficAge"),
-            "contagem_de_incidentes": len(lista_incidentes),
-            "incidentes": lista_incidentes
-            if lista_incidentes
-            else "Não há incidentes registrados nesse trecho.",
-        }
-    else:
-        dados_incidentes = {
-            "erro": f"Falha na API: Erro ao processar indicentes - {incidentes.status_code}"
-        }
-    if congestionamento.status_code == 200:
-        dados_congestionamento = congestionamento.json()
-        dados_congestionamento = {
-            "velocidadeAtual": dados_congestionamento["flowSegmentData"][
-                "currentSpeed"
-            ],
-            "velocidadeLivre": dados_congestionamento["flowSegmentData"][
-                "freeFlowSpeed"
-            ],
-            "tempoAproximado_em_VelocidadeAtual_minutos": ceil(
-                dados_congestionamento["flowSegmentData"]["currentTravelTime"] / 60
-            ),
-            "tempoAproximado_em_VelocidadeLivre_minutos": ceil(
-                dados_congestionamento["flowSegmentData"]["freeFlowTravelTime"] / 60
-            ),
-            "tempoAproximado_em_VelocidadeAtual_horas": round(
-                dados_congestionamento["flowSegmentData"]["currentTravelTime"] / 3600, 2
-            ),
-            "tempoAproximado_em_VelocidadeLivre_horas": round(
-                dados_congestionamento["flowSegmentData"]["freeFlowTravelTime"] / 3600,
-                2,
-            ),
-            "confiabilidade": dados_congestionamento["flowSegmentData"]["confidence"],
-            "rua_fechada": dados_congestionamento["flowSegmentData"]["roadClosure"],
-        }
+
+
+@router.get("/faixa")
+async def buscar_faixa(inicio: str, fim: str, limite: int = Query(100, ge=1, le=1000)):
+    return cep_service.buscar_faixa(inicio, fim, limite)
+
+
+@router.get("/prefixo/{prefixo}")
+async def buscar_prefixo(prefixo: str, limite: int = Query(100, ge=1, le=1000)):
+    return cep_service.buscar_prefixo(prefixo, limite)
+
+
+def _cep_de_item(item) -> str:
+    if isinstance(item, dict):
+        item = item.get("cep", "")
+    if isinstance(item, int):
+        return str(item).zfill(8)
+    return str(item)
+
+
+async def _ler_ndjson(request: Request):
+    # Divide em bytes: um caractere de vários bytes pode chegar partido entre
+    # dois pedaços do corpo, mas nunca contém b"\n".
+    restante = b""
+    async for parte in request.stream():
+        *linhas, restante = (restante + parte).split(b"\n")
+        for linha in linhas:
+            if linha.strip():
+                yield _ler_linha(linha)
+    if restante.strip():
+        yield _ler_linha(restante)
+
+
+def _ler_linha(linha: bytes) -> str:
+    texto = linha.decode(errors="replace")
+    try:
+        return _cep_de_item(json.loads(texto))
+    except json.JSONDecodeError:
+        return texto.strip()
+
+
+async def _ler_ceps_ndjson(request: Request) -> list[str]:
+    # O corpo é lido antes de a resposta começar; a leitura para assim que o
+    # lote passa do limite de CEPs distintos (o excedente gera o aviso).
+    ceps = {}
+    async for cep in _ler_ndjson(request):
+        ceps.setdefault(normalizar_cep(cep), cep)
+        if len(ceps) > service_settings.LOTE_MAX_CEPS:
+            break
+    return list(ceps.values())
+
+
+async def _ler_lista(itens: list):
+    for item in itens:
+        yield _cep_de_item(item)
+
+
+@router.post("/lote", dependencies=[admissao("pesada", custo=4)])
+async def resolver_lote(request: Request, coordenadas: bool = False):
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        ceps = _ler_lista(await _ler_ceps_ndjson(request))
     else:
-        dados_congestionamento = {
-            f"Falha na API: Erro ao processar congestionamento - {congestionamento.status_code}"
-        }
-    return {
-        "incidentes_registrados": dados_incidentes,
-        "taxa_de_congestionamento": dados_congestionamento,
-    }
+        try:
+            itens = await request.json()
+        except json.JSONDecodeError:
+            itens = None
+        if not isinstance(itens, list):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Envie uma lista JSON de CEPs ou um corpo application/x-ndjson com um CEP por linha.",
+            )
+        ceps = _ler_lista(itens)
+
+    async def resultados():
+        async for resultado in cep_service.resolver_lote(ceps, coordenadas):
+            yield json.dumps(resultado, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(resultados(), media_type="application/x-ndjson")
@@ -1,36 +1,57 @@
 import json
 from uuid import UUID
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from app.admissao import admissao
+from app.database.session import async_session
 from app.dependencies import TrajetoServiceDep
-from ..apis.config import api_settings as settings
-from app.routers.trajeto import retornar_trajeto
-from google import genai
-
-from app.utils import limpar_resposta
+from app.respostas import resposta_condicional
+from app.services import insights as insights_service
+from app.services.trajeto import TrajetoService
 
 router = APIRouter(tags=["insights"], prefix="/insights")
-client = genai.Client(api_key=settings.GEMINI_KEY)
 
 
-@router.post("/criar_com_ia")
+@router.post("/criar_com_ia", dependencies=[admissao("pesada", custo=2)])
 async def ai_insights(
     id: UUID, senha_trajeto: str, service: TrajetoServiceDep, salvar_no_banco: int = 0
 ):
-    dados_trajeto = await retornar_trajeto(id, senha_trajeto, service)
-    prompt = settings.PROMPT_BASE.format(dados_trajeto=dados_trajeto)
-    response = client.models.generate_content(
-        model=settings.GEMINI_MODEL,
-        contents=prompt,
-    )
-    resposta_formatada = json.loads(limpar_resposta(response.text))
+    dados_trajeto = await service.get_trajeto(id, senha_trajeto)
+    resposta_formatada = await insights_service.gerar_insight(dados_trajeto)
     if salvar_no_banco == 1:
         await service.add_insight(id, senha_trajeto, resposta_formatada)
     return resposta_formatada
 
 
+@router.post("/criar_com_ia/stream", dependencies=[admissao("pesada", custo=2)])
+async def transmitir_ai_insights(
+    id: UUID, senha_trajeto: str, service: TrajetoServiceDep, salvar_no_banco: int = 0
+):
+    dados_trajeto = await service.get_trajeto(id, senha_trajeto)
+
+    async def partes():
+        texto = ""
+        async for parte in insights_service.transmitir_insight(dados_trajeto):
+            texto += parte
+            yield parte
+        if salvar_no_banco == 1:
+            try:
+                resposta_formatada = insights_service.interpretar_resposta(texto)
+            except json.JSONDecodeError:
+                return
+            async with async_session() as session:
+                await TrajetoService(session).add_insight(
+                    id, senha_trajeto, resposta_formatada
+                )
+
+    return StreamingResponse(partes(), media_type="text/plain; charset=utf-8")
+
+
 @router.get("/retornar")
-async def retornar_insight(id: UUID, senha_trajeto: str, service: TrajetoServiceDep):
-    return await service.get_insight(id, senha_trajeto)
+async def retornar_insight(
+    id: UUID, senha_trajeto: str, service: TrajetoServiceDep, request: Request
+):
+    return resposta_condicional(request, await service.get_insight(id, senha_trajeto))
 
 
 @router.delete("/excluir_insight_salvo")
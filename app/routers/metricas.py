@@ -0,0 +1,78 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app import admissao, metricas
+from app.apis import clients, singleflight
+from app.cache.core import _caches
+
+router = APIRouter(tags=["Métricas"])
+
+
+def _estado_atual() -> list[metricas.Metrica]:
+    circuito = metricas.Metrica(
+        "rotaja_circuito_aberto",
+        "gauge",
+        "1 quando o circuit breaker do provedor está aberto ou em teste.",
+    )
+    hedges = metricas.Metrica(
+        "rotaja_hedges_total", "counter", "Segundas tentativas disparadas (hedge)."
+    )
+    for provider, dados in clients.estatisticas().items():
+        circuito.definir(int(dados["estado"] != "fechado"), provider=provider)
+        hedges.definir(dados["hedges"], provider=provider)
+
+    chamadas = metricas.Metrica(
+        "rotaja_singleflight_chamadas_total",
+        "counter",
+        "Chamadas efetivamente executadas por grupo de coalescência.",
+    )
+    coalescidas = metricas.Metrica(
+        "rotaja_singleflight_coalescidas_total",
+        "counter",
+        "Chamadas que reaproveitaram uma execução em andamento.",
+    )
+    for grupo, dados in singleflight.estatisticas().items():
+        chamadas.definir(dados["chamadas"], grupo=grupo)
+        coalescidas.definir(dados["coalescidas"], grupo=grupo)
+
+    em_uso = metricas.Metrica(
+        "rotaja_admissao_em_uso",
+        "gauge",
+        "Custo ocupado pelas requisições em andamento, por classe.",
+    )
+    na_fila = metricas.Metrica(
+        "rotaja_admissao_fila", "gauge", "Requisições aguardando vaga, por classe."
+    )
+    rejeicoes = metricas.Metrica(
+        "rotaja_admissao_rejeicoes_total",
+        "counter",
+        "Requisições recusadas pelo controle de admissão, por classe e motivo.",
+    )
+    for classe, dados in admissao.estatisticas().items():
+        em_uso.definir(dados["em_uso"], classe=classe)
+        na_fila.definir(dados["na_fila"], classe=classe)
+        for motivo, total in dados["rejeicoes"].items():
+            rejeicoes.definir(total, classe=classe, motivo=motivo)
+    return [circuito, hedges, chamadas, coalescidas, em_uso, na_fila, rejeicoes]
+
+
+def _cache() -> list[metricas.Metrica]:
+    consultas = metricas.Metrica(
+        "rotaja_cache_consultas_total", "counter", "Consultas ao cache por resultado."
+    )
+    # Só os contadores em memória: as estatísticas do backend (no Postgres,
+    # um COUNT na tabela inteira) não são necessárias a cada coleta.
+    for nome, cache in _caches.items():
+        for resultado in ("acertos", "acertos_negativos", "falhas"):
+            consultas.definir(
+                getattr(cache, resultado), cache=nome, resultado=resultado
+            )
+    return [consultas]
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def exportar_metricas():
+    return PlainTextResponse(
+        metricas.exportar([*_estado_atual(), *_cache()]),
+        media_type="text/plain; version=0.0.4",
+    )
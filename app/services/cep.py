@@ -0,0 +1,487 @@
+import asyncio
+from datetime import date
+from math import ceil, floor
+from collections.abc import AsyncIterator
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.apis import clients
+from app.apis.config import api_settings as settings
+from app.apis.singleflight import SingleFlight
+from app.cache.config import cache_settings
+from app.cache.core import Cache, agora_iso
+from app.cache.tiles import TileCache
+from app.metricas import medido
+from app.services.cep_local import obter_indice
+from app.services.config import service_settings
+from app.utils import normalizar_cep
+
+cep_cache = Cache(
+    "cep", cache_settings.CACHE_CEP_TTL, cache_settings.CACHE_CEP_TTL_NEGATIVO
+)
+geocodificacao_cache = Cache(
+    "geocodificacao",
+    cache_settings.CACHE_GEOCODIFICACAO_TTL,
+    cache_settings.CACHE_GEOCODIFICACAO_TTL_NEGATIVO,
+)
+poi_cache = TileCache(
+    "pontos_de_referencia",
+    cache_settings.CACHE_POI_TTL,
+    cache_settings.CACHE_POI_TILE_GRAUS,
+    cache_settings.CACHE_POI_MAX_TILES,
+    cache_settings.CACHE_POI_TILES_EM_MEMORIA,
+)
+incidentes_cache = Cache("trafego_incidentes", cache_settings.CACHE_TRAFEGO_TTL)
+fluxo_cache = Cache("trafego_fluxo", cache_settings.CACHE_TRAFEGO_TTL)
+clima_cache = Cache("clima", cache_settings.CACHE_CLIMA_TTL)
+_consultas = SingleFlight("consultas_em_cache")
+
+DIAS_PREVISAO_MAXIMO = 14
+
+
+@medido("cep")
+async def consultar_viacep(cep: str):
+    cep = normalizar_cep(cep)
+    indice = obter_indice()
+    if indice is not None and (dados := indice.buscar(cep)) is not None:
+        return {"status_code": 200, "dados": dados}
+    encontrado, resultado = await cep_cache.get(cep)
+    if encontrado:
+        return resultado
+    response = await clients.fetch("viacep", f"{settings.VIACEP_URL}/{cep}/json/")
+    if response.status_code == 200:
+        resultado = {"status_code": 200, "dados": response.json()}
+        await cep_cache.set(cep, resultado, negativo="erro" in resultado["dados"])
+    else:
+        resultado = {"status_code": response.status_code, "dados": None}
+        if response.status_code == 400:
+            await cep_cache.set(cep, resultado, negativo=True)
+    return resultado
+
+
+@medido("geocodificacao")
+async def geocodificar_endereco(endereco: str):
+    chave = endereco.lower()
+    encontrado, resultado = await geocodificacao_cache.get(chave)
+    if encontrado:
+        return resultado
+    response = await clients.fetch(
+        "locationiq", f"{settings.LOCATIONIQ_URL}&q={endereco}&format=json"
+    )
+    if response.status_code == 200:
+        coordenadas = response.json()
+        resultado = {
+            "status_code": 200,
+            "dados": {
+                "lat": coordenadas[0].get("lat"),
+                "lon": coordenadas[0].get("lon"),
+                "display_name": coordenadas[0].get("display_name"),
+                "class": coordenadas[0].get("class"),
+                "type": coordenadas[0].get("type"),
+                "bounding_box": coordenadas[0].get("boundingbox"),
+            },
+        }
+        await geocodificacao_cache.set(chave, resultado)
+    else:
+        resultado = {"status_code": response.status_code, "dados": None}
+        if response.status_code == 404:
+            await geocodificacao_cache.set(chave, resultado, negativo=True)
+    return resultado
+
+
+async def buscar_cep(cep: str):
+    response = await consultar_viacep(cep)
+    if response["status_code"] == 200:
+        return response["dados"]
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Falha na API: Erro ao buscar CEP - {response['status_code']}.",
+        )
+
+
+async def formatar_cep(cep: str, numero: str | None = None):
+    response = await consultar_viacep(cep)
+    if response["status_code"] == 200:
+        endereco_completo = response["dados"]
+        logradouro = endereco_completo.get("logradouro")
+        bairro = endereco_completo.get("bairro")
+        cidade = endereco_completo.get("localidade")
+        estado = endereco_completo.get("uf")
+        endereco_formatado = f"{logradouro}"
+        if numero:
+            endereco_formatado += f", {numero}"
+        endereco_formatado += f", {bairro}, {cidade} - {estado}, Brasil"
+        return endereco_formatado
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Falha na API: Erro ao obter endereço - {response['status_code']}.",
+        )
+
+
+def _coordenadas_locais(cep: str, endereco_completo: str):
+    indice = obter_indice()
+    if indice is None:
+        return None
+    coordenadas = indice.coordenadas_do_cep(normalizar_cep(cep))
+    if coordenadas is None:
+        return None
+    lat, lon = coordenadas
+    margem = service_settings.CEP_LOCAL_MARGEM_GRAUS
+    return {
+        "lat": f"{lat:.6f}",
+        "lon": f"{lon:.6f}",
+        "display_name": endereco_completo,
+        "class": None,
+        "type": None,
+        "bounding_box": [
+            f"{lat - margem:.6f}",
+            f"{lat + margem:.6f}",
+            f"{lon - margem:.6f}",
+            f"{lon + margem:.6f}",
+        ],
+    }
+
+
+async def obter_coordenadas(cep: str, numero: str | None = None):
+    endereco_completo = await formatar_cep(cep, numero)
+    if not numero and (locais := _coordenadas_locais(cep, endereco_completo)):
+        return locais
+    response = await geocodificar_endereco(endereco_completo)
+    if response["status_code"] == 200:
+        return response["dados"]
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Falha na API: Erro ao obter coordenadas - {response['status_code']}.",
+        )
+
+
+def _indice_local():
+    indice = obter_indice()
+    if indice is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Índice local de CEPs não configurado.",
+        )
+    return indice
+
+
+def buscar_faixa(inicio: str, fim: str, limite: int = 100):
+    inicio, fim = normalizar_cep(inicio), normalizar_cep(fim)
+    if not (inicio.isdigit() and fim.isdigit() and len(inicio) == len(fim) == 8):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe CEPs de início e fim com 8 dígitos.",
+        )
+    return _indice_local().faixa(inicio, fim, limite)
+
+
+def buscar_prefixo(prefixo: str, limite: int = 100):
+    if not prefixo.isdigit() or len(prefixo) > 8:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O prefixo deve conter de 1 a 8 dígitos.",
+        )
+    return _indice_local().prefixo(prefixo, limite)
+
+
+def _erro_referencias(status_code: int):
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Falha na API: Erro ao obter pontos de referência - {status_code}.",
+    )
+
+
+async def _referencias_do_tile(sul, oeste, norte, leste):
+    consulta = settings.OVERPASS_URL.removesuffix("around:")
+    response = await clients.fetch(
+        "overpass", f"{consulta}{sul},{oeste},{norte},{leste});out;"
+    )
+    if response.status_code != 200:
+        raise _erro_referencias(response.status_code)
+    return response.json()["elements"]
+
+
+@medido("referencias")
+async def pontos_de_referencia(latitude, longitude, raio_em_metros: float = 300):
+    # Raios muito grandes cobririam tiles demais; nesse caso a consulta
+    # around: original segue direto para o Overpass.
+    referencias = await poi_cache.buscar(
+        float(latitude), float(longitude), raio_em_metros, _referencias_do_tile
+    )
+    if referencias is not None:
+        return referencias
+    response = await clients.fetch(
+        "overpass",
+        f"{settings.OVERPASS_URL}{raio_em_metros},{latitude},{longitude});out;",
+    )
+    if response.status_code == 200:
+        referencias = response.json()
+        return [element for element in referencias["elements"]]
+    else:
+        raise _erro_referencias(response.status_code)
+
+
+def _processar_incidentes(incidentes):
+    if incidentes.status_code == 200:
+        incidentes = incidentes.json()
+
+        lista_incidentes = incidentes["viewpResp"]["trafficState"].get("incidents", [])
+        dados_incidentes = {
+            "idade_das_informacoes_segundos": incidentes["viewpResp"][
+                "trafficState"
+            ].get("@trafficAge"),
+            "contagem_de_incidentes": len(lista_incidentes),
+            "incidentes": lista_incidentes
+            if lista_incidentes
+            else "Não há incidentes registrados nesse trecho.",
+        }
+    else:
+        dados_incidentes = {
+            "erro": f"Falha na API: Erro ao processar indicentes - {incidentes.status_code}"
+        }
+    return dados_incidentes
+
+
+def _processar_congestionamento(congestionamento):
+    if congestionamento.status_code == 200:
+        dados_congestionamento = congestionamento.json()
+        dados_congestionamento = {
+            "velocidadeAtual": dados_congestionamento["flowSegmentData"][
+                "currentSpeed"
+            ],
+            "velocidadeLivre": dados_congestionamento["flowSegmentData"][
+                "freeFlowSpeed"
+            ],
+            "tempoAproximado_em_VelocidadeAtual_minutos": ceil(
+                dados_congestionamento["flowSegmentData"]["currentTravelTime"] / 60
+            ),
+            "tempoAproximado_em_VelocidadeLivre_minutos": ceil(
+                dados_congestionamento["flowSegmentData"]["freeFlowTravelTime"] / 60
+            ),
+            "tempoAproximado_em_VelocidadeAtual_horas": round(
+                dados_congestionamento["flowSegmentData"]["currentTravelTime"] / 3600, 2
+            ),
+            "tempoAproximado_em_VelocidadeLivre_horas": round(
+                dados_congestionamento["flowSegmentData"]["freeFlowTravelTime"] / 3600,
+                2,
+            ),
+            "confiabilidade": dados_congestionamento["flowSegmentData"]["confidence"],
+            "rua_fechada": dados_congestionamento["flowSegmentData"]["roadClosure"],
+        }
+    else:
+        dados_congestionamento = {
+            "erro": f"Falha na API: Erro ao processar congestionamento - {congestionamento.status_code}"
+        }
+    return dados_congestionamento
+
+
+async def _buscar_e_guardar(cache: Cache, chave: str, buscar):
+    obtido_em = agora_iso()
+    resultado, guardar = await buscar()
+    if guardar:
+        await cache.set(chave, resultado, gravado_em=obtido_em)
+    return resultado, obtido_em
+
+
+# Devolve o valor e o horário em que ele foi obtido da API, que é mais antigo
+# que o horário da consulta quando o valor vem do cache.
+async def _consultar_com_cache(cache: Cache, chave: str, buscar):
+    encontrado, resultado, obtido_em = await cache.get_com_horario(chave)
+    if encontrado:
+        return resultado, obtido_em or agora_iso()
+    # Trechos vizinhos de uma mesma rota pedem a mesma chave ao mesmo tempo;
+    # só a primeira consulta vai à API e as demais aguardam o resultado.
+    return await _consultas.executar(
+        cache._chave(chave), lambda: _buscar_e_guardar(cache, chave, buscar)
+    )
+
+
+async def _buscar_trafego(url: str, processar):
+    response = await clients.fetch("tomtom", url)
+    return processar(response), response.status_code == 200
+
+
+def _ajustar_ao_tile(minimo: float, maximo: float) -> tuple[float, float]:
+    passo = cache_settings.CACHE_TRAFEGO_TILE_GRAUS
+    return (
+        round(floor(minimo / passo) * passo, 6),
+        round((floor(maximo / passo) + 1) * passo, 6),
+    )
+
+
+def _incidente_na_area(incidente, bounding_box: list) -> bool:
+    # Os incidentes da TomTom trazem a posição em "p" (x = longitude,
+    # y = latitude); os que vierem sem ela são mantidos.
+    posicao = incidente.get("p") if isinstance(incidente, dict) else None
+    if not isinstance(posicao, dict) or "x" not in posicao or "y" not in posicao:
+        return True
+    minY, maxY, minX, maxX = (float(valor) for valor in bounding_box)
+    return minY <= float(posicao["y"]) <= maxY and minX <= float(posicao["x"]) <= maxX
+
+
+def _filtrar_incidentes(dados_incidentes: dict, bounding_box: list) -> dict:
+    if not isinstance(dados_incidentes.get("incidentes"), list):
+        return dados_incidentes
+    incidentes = [
+        incidente
+        for incidente in dados_incidentes["incidentes"]
+        if _incidente_na_area(incidente, bounding_box)
+    ]
+    return {
+        **dados_incidentes,
+        "contagem_de_incidentes": len(incidentes),
+        "incidentes": incidentes
+        if incidentes
+        else "Não há incidentes registrados nesse trecho.",
+    }
+
+
+@medido("trafego")
+async def consultar_trafego(latitude, longitude, bounding_box: list):
+    minY, maxY = _ajustar_ao_tile(float(bounding_box[0]), float(bounding_box[1]))
+    minX, maxX = _ajustar_ao_tile(float(bounding_box[2]), float(bounding_box[3]))
+    boundingBox = f"{minY},{maxY},{minX},{maxX}"
+    passo = cache_settings.CACHE_TRAFEGO_PONTO_GRAUS
+    ponto = f"{round(float(latitude) / passo)}:{round(float(longitude) / passo)}"
+    incidentes, congestionamento = await asyncio.gather(
+        _consultar_com_cache(
+            incidentes_cache,
+            boundingBox,
+            lambda: _buscar_trafego(
+                f"{settings.TOMTOM_URL}/incidentViewport/{boundingBox}/0/{boundingBox}/22/true/json?key={settings.TOMTOM_KEY}",
+                _processar_incidentes,
+            ),
+        ),
+        _consultar_com_cache(
+            fluxo_cache,
+            ponto,
+            lambda: _buscar_trafego(
+                f"{settings.TOMTOM_URL}/flowSegmentData/absolute/10/json?point={latitude},{longitude}&unit=KMPH&fields=currentSpeed,freeFlowSpeed,confidence&key={settings.TOMTOM_KEY}",
+                _processar_congestionamento,
+            ),
+        ),
+    )
+    # O cache guarda o tile inteiro; a resposta só leva os incidentes da área
+    # pedida.
+    dados = {
+        "incidentes_registrados": _filtrar_incidentes(incidentes[0], bounding_box),
+        "taxa_de_congestionamento": congestionamento[0],
+    }
+    # O dado mais antigo dos dois define a idade do tráfego informado.
+    return dados, min(incidentes[1], congestionamento[1])
+
+
+async def trafego(latitude, longitude, bounding_box: list):
+    dados, _ = await consultar_trafego(latitude, longitude, bounding_box)
+    return dados
+
+
+async def _buscar_previsao(latitude: float, longitude: float):
+    response = await clients.fetch(
+        "weatherapi",
+        f"{settings.WEATHER_API_URL}{settings.WEATHER_API_KEY}&q={latitude},{longitude}&days={DIAS_PREVISAO_MAXIMO}",
+    )
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Falha na API: Erro ao obter previsão do clima - {response.status_code}.",
+        )
+    return response.json()["forecast"]["forecastday"], True
+
+
+@medido("clima")
+async def consultar_previsao_clima(latitude, longitude, dias: int):
+    # A previsão é buscada uma vez por célula e por dia, sempre com o máximo
+    # de dias, e recortada para cada pedido.
+    passo = cache_settings.CACHE_CLIMA_CELULA_GRAUS
+    linha = floor(float(latitude) / passo)
+    coluna = floor(float(longitude) / passo)
+    previsao, obtido_em = await _consultar_com_cache(
+        clima_cache,
+        f"{date.today().isoformat()}:{linha}:{coluna}",
+        lambda: _buscar_previsao(
+            round((linha + 0.5) * passo, 4), round((coluna + 0.5) * passo, 4)
+        ),
+    )
+    return previsao[:dias], obtido_em
+
+
+async def resolver_item_lote(cep: str, incluir_coordenadas: bool = False):
+    if len(cep) != 8 or not cep.isdigit():
+        return {"cep": cep, "erro": "CEP inválido: são esperados 8 dígitos."}
+    try:
+        dados = await buscar_cep(cep)
+        if "erro" in dados:
+            return {"cep": cep, "erro": "CEP não encontrado."}
+        resultado = {"cep": cep, "dados": dados}
+        if incluir_coordenadas:
+            resultado["coordenadas"] = await obter_coordenadas(cep)
+        return resultado
+    except HTTPException as e:
+        return {"cep": cep, "erro": e.detail}
+
+
+async def resolver_lote(ceps: AsyncIterator[str], incluir_coordenadas: bool = False):
+    concorrencia = service_settings.LOTE_CONCORRENCIA
+    entrada: asyncio.Queue = asyncio.Queue(maxsize=concorrencia * 2)
+    saida: asyncio.Queue = asyncio.Queue()
+
+    async def produzir():
+        vistos = set()
+        try:
+            async for cep in ceps:
+                cep = normalizar_cep(cep)
+                if cep in vistos:
+                    continue
+                if len(vistos) >= service_settings.LOTE_MAX_CEPS:
+                    await saida.put(
+                        {
+                            "erro": f"Limite de {service_settings.LOTE_MAX_CEPS} CEPs distintos por lote excedido; os demais foram ignorados."
+                        }
+                    )
+                    break
+                vistos.add(cep)
+                await entrada.put(cep)
+        finally:
+            # Cancelado junto com o lote, não há mais quem consuma a fila.
+            if not asyncio.current_task().cancelling():
+                for _ in range(concorrencia):
+                    await entrada.put(None)
+
+    async def consumir():
+        try:
+            while (cep := await entrada.get()) is not None:
+                # Erros das APIs já chegam como HTTPException e viram a linha de
+                # erro em resolver_item_lote; aqui ficam as falhas de rede que
+                # escapam do cliente e as respostas em formato inesperado.
+                try:
+                    resultado = await resolver_item_lote(cep, incluir_coordenadas)
+                except (httpx.HTTPError, ValueError, KeyError) as e:
+                    resultado = {
+                        "cep": cep,
+                        "erro": f"Falha ao resolver o CEP - {type(e).__name__}.",
+                    }
+                await saida.put(resultado)
+        finally:
+            await saida.put(None)
+
+    tarefas = [asyncio.create_task(produzir())] + [
+        asyncio.create_task(consumir()) for _ in range(concorrencia)
+    ]
+    try:
+        ativos = concorrencia
+        while ativos:
+            resultado = await saida.get()
+            if resultado is None:
+                ativos -= 1
+            else:
+                yield resultado
+        await tarefas[0]
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
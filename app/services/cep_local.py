@@ -0,0 +1,205 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.services.config import service_settings as settings
+
+CAMPOS_COORDENADAS = {"lat", "lon", "latitude", "longitude"}
+INTERVALO_VERIFICACAO_SEGUNDOS = 30
+
+
+def _formatar_cep(cep: int) -> str:
+    cep = f"{cep:08d}"
+    return f"{cep[:5]}-{cep[5:]}"
+
+
+def _coordenada(linha: dict, limite: float, *campos: str) -> float:
+    for campo in campos:
+        valor = (linha.get(campo) or "").strip().replace(",", ".")
+        if valor:
+            coordenada = float(valor)
+            if not -limite <= coordenada <= limite:
+                raise ValueError(f"{campo} fora do intervalo: {valor}")
+            return coordenada
+    return np.nan
+
+
+def importar_csv(
+    arquivo: str | Path, destino: str | Path, delimitador: str = ","
+) -> tuple[int, int]:
+    registros = {}
+    # Linhas com lat/lon que não são números válidos ficam de fora e são
+    # contadas, em vez de interromper a importação da base inteira.
+    ignoradas = 0
+    with open(arquivo, newline="", encoding="utf-8") as csv_entrada:
+        for linha in csv.DictReader(csv_entrada, delimiter=delimitador):
+            digitos = "".join(c for c in linha.get("cep", "") if c.isdigit())
+            if len(digitos) != 8:
+                continue
+            try:
+                lat = _coordenada(linha, 90, "lat", "latitude")
+                lon = _coordenada(linha, 180, "lon", "longitude")
+            except ValueError:
+                ignoradas += 1
+                continue
+            cep = int(digitos)
+            dados = {
+                campo: (valor or "").strip()
+                for campo, valor in linha.items()
+                if campo and campo != "cep" and campo not in CAMPOS_COORDENADAS
+            }
+            registros[cep] = ({"cep": _formatar_cep(cep), **dados}, lat, lon)
+
+    ceps = np.fromiter(sorted(registros), dtype=np.uint32, count=len(registros))
+    offsets = np.zeros(len(ceps) + 1, dtype=np.uint64)
+    coordenadas = np.empty((len(ceps), 2), dtype=np.float32)
+
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = Path(tempfile.mkdtemp(prefix=".cep_local_", dir=destino.parent))
+    with open(temporario / "registros.bin", "wb") as saida:
+        posicao = 0
+        for i, cep in enumerate(ceps.tolist()):
+            dados, lat, lon = registros[cep]
+            conteudo = json.dumps(dados, ensure_ascii=False).encode()
+            saida.write(conteudo)
+            posicao += len(conteudo)
+            offsets[i + 1] = posicao
+            coordenadas[i] = (lat, lon)
+    np.save(temporario / "ceps.npy", ceps)
+    np.save(temporario / "offsets.npy", offsets)
+    np.save(temporario / "coordenadas.npy", coordenadas)
+    (temporario / "manifesto.json").write_text(
+        json.dumps({"total": len(ceps), "importado_em": time.time()})
+    )
+
+    antigo = destino.with_name(f".{destino.name}.antigo")
+    if destino.exists():
+        destino.rename(antigo)
+    temporario.rename(destino)
+    shutil.rmtree(antigo, ignore_errors=True)
+    return len(ceps), ignoradas
+
+
+class IndiceCep:
+    def __init__(self, diretorio: str | Path):
+        diretorio = Path(diretorio)
+        self.diretorio = diretorio
+        self.versao = (diretorio / "manifesto.json").stat().st_mtime
+        # np.asarray mantém o mapeamento em disco, mas evita o custo de
+        # np.memmap em cada indexação escalar.
+        self.ceps = np.asarray(np.load(diretorio / "ceps.npy", mmap_mode="r"))
+        self.offsets = np.asarray(np.load(diretorio / "offsets.npy", mmap_mode="r"))
+        self.coordenadas = np.asarray(
+            np.load(diretorio / "coordenadas.npy", mmap_mode="r")
+        )
+        self.registros = (
+            np.asarray(np.memmap(diretorio / "registros.bin", dtype=np.uint8, mode="r"))
+            if self.offsets[-1]
+            else np.zeros(0, dtype=np.uint8)
+        )
+
+    def __len__(self):
+        return len(self.ceps)
+
+    def _registro(self, indice: int) -> dict:
+        inicio, fim = int(self.offsets[indice]), int(self.offsets[indice + 1])
+        return json.loads(self.registros[inicio:fim].tobytes())
+
+    def _indice(self, cep: str) -> int | None:
+        if len(cep) != 8 or not cep.isdigit():
+            return None
+        valor = np.uint32(cep)
+        indice = int(self.ceps.searchsorted(valor))
+        if indice < len(self.ceps) and self.ceps[indice] == valor:
+            return indice
+        return None
+
+    def buscar(self, cep: str) -> dict | None:
+        indice = self._indice(cep)
+        return None if indice is None else self._registro(indice)
+
+    def coordenadas_do_cep(self, cep: str) -> tuple[float, float] | None:
+        indice = self._indice(cep)
+        if indice is None:
+            return None
+        lat, lon = self.coordenadas[indice]
+        if np.isnan(lat) or np.isnan(lon):
+            return None
+        return float(lat), float(lon)
+
+    def faixa(self, inicio: str, fim: str, limite: int = 100) -> list[dict]:
+        primeiro = int(self.ceps.searchsorted(np.uint32(inicio), side="left"))
+        ultimo = int(self.ceps.searchsorted(np.uint32(fim), side="right"))
+        return [
+            self._registro(i) for i in range(primeiro, min(ultimo, primeiro + limite))
+        ]
+
+    def prefixo(self, prefixo: str, limite: int = 100) -> list[dict]:
+        complemento = 8 - len(prefixo)
+        return self.faixa(
+            prefixo + "0" * complemento, prefixo + "9" * complemento, limite
+        )
+
+
+_indice: IndiceCep | None = None
+_verificado_em = 0.0
+
+
+def obter_indice() -> IndiceCep | None:
+    global _indice, _verificado_em
+    if not settings.CEP_LOCAL_DIR:
+        return None
+    agora = time.monotonic()
+    if _indice is not None and agora - _verificado_em < INTERVALO_VERIFICACAO_SEGUNDOS:
+        return _indice
+    _verificado_em = agora
+    manifesto = Path(settings.CEP_LOCAL_DIR) / "manifesto.json"
+    try:
+        versao = manifesto.stat().st_mtime
+        if _indice is None or _indice.versao != versao:
+            _indice = IndiceCep(settings.CEP_LOCAL_DIR)
+    except FileNotFoundError:
+        # Uma importação em andamento troca o diretório de lugar; até a
+        # próxima verificação, segue o índice já aberto, cujos arquivos
+        # mapeados continuam válidos mesmo depois de removidos.
+        pass
+    return _indice
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Importa ou atualiza o índice local de CEPs a partir de um CSV."
+    )
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    importar = subcomandos.add_parser("importar")
+    importar.add_argument(
+        "arquivo", help="CSV com a coluna cep e, opcionalmente, lat/lon"
+    )
+    importar.add_argument("--destino", default=settings.CEP_LOCAL_DIR)
+    importar.add_argument("--delimitador", default=",")
+    argumentos = parser.parse_args()
+
+    if not argumentos.destino:
+        parser.error("informe --destino ou configure CEP_LOCAL_DIR")
+    inicio = time.perf_counter()
+    total, ignoradas = importar_csv(
+        argumentos.arquivo, argumentos.destino, argumentos.delimitador
+    )
+    print(
+        f"{total} CEPs importados em {os.fspath(argumentos.destino)} "
+        f"({time.perf_counter() - inicio:.1f}s)"
+    )
+    if ignoradas:
+        print(f"{ignoradas} linhas ignoradas por lat/lon inválidos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+_base_config = SettingsConfigDict(
+    env_file="./.env", extra="ignore", env_ignore_empty=True
+)
+
+
+class ServiceSettings(BaseSettings):
+    model_config = _base_config
+    ROTA_ESPACAMENTO_METROS: float = 5000.0
+    ROTA_MIN_PONTOS: int = 5
+    ROTA_MAX_PONTOS: int = 30
+    LOTE_MAX_CEPS: int = 10_000
+    LOTE_CONCORRENCIA: int = 50
+    MATRIZ_MAX_CEPS: int = 100
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    ARGON2_WORKERS: int = 4
+    ACESSO_CACHE_TTL_SEGUNDOS: int = 300
+    ACESSO_CACHE_MAX_ENTRADAS: int = 10_000
+    TRABALHOS_WORKERS: int = 2
+    TRABALHOS_MAX_PENDENTES: int = 100
+    TRABALHOS_MAX_TENTATIVAS: int = 3
+    TRABALHOS_LEASE_SEGUNDOS: int = 300
+    TRABALHOS_INTERVALO_BUSCA_SEGUNDOS: float = 2.0
+    TRABALHOS_ESPERA_MAXIMA_SEGUNDOS: float = 30.0
+    TRABALHOS_BACKOFF_SEGUNDOS: float = 5.0
+    TRABALHOS_BACKOFF_MAXIMO_SEGUNDOS: float = 300.0
+    CEP_LOCAL_DIR: str | None = None
+    CEP_LOCAL_MARGEM_GRAUS: float = 0.0025
+    COMPRESSAO_TAMANHO_MINIMO: int = 1024
+    COMPRESSAO_NIVEL_GZIP: int = 6
+    COMPRESSAO_NIVEL_BROTLI: int = 4
+    ADMISSAO_ATIVA: bool = True
+    ADMISSAO_CONSULTA_CAPACIDADE: int = 64
+    ADMISSAO_PESADA_CAPACIDADE: int = 16
+    ADMISSAO_FILA_MAXIMA: int = 32
+    ADMISSAO_ESPERA_MAXIMA_SEGUNDOS: float = 5.0
+    ADMISSAO_POR_CLIENTE: int | None = None
+    ADMISSAO_CABECALHO_CLIENTE: str | None = None
+
+
+service_settings = ServiceSettings()
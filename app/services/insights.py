@@ -0,0 +1,72 @@
+import hashlib
+import json
+
+from google import genai
+from google.genai import types
+
+from app.apis.config import api_settings as settings
+from app.cache.config import cache_settings
+from app.cache.core import Cache
+from app.metricas import medir
+from app.utils import limpar_resposta
+
+client = genai.Client(
+    api_key=settings.GEMINI_KEY,
+    http_options=types.HttpOptions(base_url=settings.GEMINI_BASE_URL)
+    if settings.GEMINI_BASE_URL
+    else None,
+)
+insights_cache = Cache("insights", cache_settings.CACHE_INSIGHTS_TTL)
+
+
+def montar_prompt(trajeto: dict) -> str:
+    return settings.PROMPT_BASE.format(dados_trajeto=trajeto)
+
+
+def _chave(trajeto: dict) -> str:
+    dados = json.dumps(
+        trajeto["dados_trajeto"], sort_keys=True, ensure_ascii=False, default=str
+    )
+    conteudo = f"{settings.GEMINI_MODEL}\0{settings.PROMPT_BASE}\0{dados}"
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+def interpretar_resposta(texto: str) -> dict:
+    return json.loads(limpar_resposta(texto))
+
+
+async def gerar_insight(trajeto: dict) -> dict:
+    chave = _chave(trajeto)
+    encontrado, texto = await insights_cache.get(chave)
+    if encontrado:
+        return interpretar_resposta(texto)
+    with medir("ia"):
+        response = await client.aio.models.generate_content(
+            model=settings.GEMINI_MODEL,
+            contents=montar_prompt(trajeto),
+        )
+    resposta_formatada = interpretar_resposta(response.text)
+    await insights_cache.set(chave, response.text)
+    return resposta_formatada
+
+
+async def transmitir_insight(trajeto: dict):
+    chave = _chave(trajeto)
+    encontrado, texto = await insights_cache.get(chave)
+    if encontrado:
+        yield texto
+        return
+    partes = []
+    async for parte in await client.aio.models.generate_content_stream(
+        model=settings.GEMINI_MODEL,
+        contents=montar_prompt(trajeto),
+    ):
+        if parte.text:
+            partes.append(parte.text)
+            yield parte.text
+    texto = "".join(partes)
+    try:
+        interpretar_resposta(texto)
+    except json.JSONDecodeError:
+        return
+    await insights_cache.set(chave, texto)
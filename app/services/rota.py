@@ -0,0 +1,419 @@
+import asyncio
+from datetime import datetime
+from math import ceil
+from fastapi import HTTPException, status
+
+from app.apis import clients
+from app.apis.config import api_settings as settings
+from app.apis.singleflight import SingleFlight
+from app.cache.config import cache_settings
+from app.cache.spatial import SpatialCache
+from app.metricas import medido
+from app.services import cep as cep_service
+from app.services.config import service_settings
+from app.services.traducao import traduzir_condicao
+from app.utils import formatar_numero, normalizar_cep, simplificar_rota
+
+reversa_cache = SpatialCache(
+    "geocodificacao_reversa",
+    cache_settings.CACHE_REVERSA_TTL,
+    cache_settings.CACHE_REVERSA_CELULA_GRAUS,
+    cache_settings.CACHE_REVERSA_RAIO_METROS,
+    cache_settings.CACHE_REVERSA_MAX_POR_CELULA,
+)
+trajetos_simples = SingleFlight("trajeto_simples")
+trajetos_completos = SingleFlight("trajeto_completo")
+
+
+@medido("rota")
+async def calcular_rota(coordenadas_origem: dict, coordenadas_destino: dict):
+    informacoes_trajeto = await clients.fetch(
+        "tomtom",
+        f"{settings.TOMTOM_ROUTING_URL}/calculateRoute/{coordenadas_origem['lat']},{coordenadas_origem['lon']}:{coordenadas_destino['lat']},{coordenadas_destino['lon']}/json?traffic=true&travelMode=car&key={settings.TOMTOM_KEY}",
+    )
+    if informacoes_trajeto.status_code == 200:
+        return informacoes_trajeto.json()
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Falha na API: Erro ao buscar informações do trajeto - {informacoes_trajeto.status_code}",
+        )
+
+
+def informacoes_basicas(trajeto_json: dict):
+    return {
+        "distancia_em_km": formatar_numero(
+            str(trajeto_json["routes"][0]["summary"]["lengthInMeters"] / 1000)
+        ),
+        "tempo_estimado_em_minutos": ceil(
+            trajeto_json["routes"][0]["summary"]["travelTimeInSeconds"] / 60
+        ),
+        "tempo_estimado_em_horas": round(
+            trajeto_json["routes"][0]["summary"]["travelTimeInSeconds"] / 3600, 2
+        ),
+        "veiculo_exemplo": trajeto_json["routes"][0]["sections"][0]["travelMode"],
+    }
+
+
+@medido("geocodificacao_reversa")
+async def geocodificacao_reversa(ponto: dict):
+    latitude, longitude = ponto["latitude"], ponto["longitude"]
+    trecho = await reversa_cache.buscar(latitude, longitude)
+    if trecho is not None:
+        return trecho
+    response = await clients.fetch(
+        "locationiq",
+        f"{settings.LOCATIONIQ_REVERSE_GEOCODING_URL}{settings.LOCATIONIQ_KEY}&q=&lat={latitude}&lon={longitude}&format=json",
+    )
+    trecho = response.json()
+    if response.status_code == 200:
+        await reversa_cache.guardar(latitude, longitude, trecho)
+    return trecho
+
+
+async def resolver_trechos(pontos: list):
+    rota_filtrada = simplificar_rota(
+        pontos,
+        service_settings.ROTA_ESPACAMENTO_METROS,
+        service_settings.ROTA_MIN_PONTOS,
+        service_settings.ROTA_MAX_PONTOS,
+    )
+    trechos = await asyncio.gather(
+        *(geocodificacao_reversa(ponto) for ponto in rota_filtrada)
+    )
+
+    trechos_filtrados = []
+    for trecho in trechos:
+        trecho_filtrado = {
+            "rua": trecho.get("address", {}).get("road", "não fornecido"),
+            "bairro": trecho.get("address", {}).get("neighbourhood", "não fornecido"),
+            "cidade": trecho.get("address", {}).get("town", "não fornecido"),
+            "estado": trecho.get("address", {}).get("state", "não fornecido"),
+            "cep": trecho.get("address", {}).get("postcode", "não fornecido"),
+        }
+        if trecho_filtrado["rua"] == "não fornecido" or not any(
+            trecho_filtrado["rua"] == filtrado["rua"]
+            for filtrado, _ in trechos_filtrados
+        ):
+            trechos_filtrados.append((trecho_filtrado, trecho))
+    return trechos_filtrados
+
+
+async def traduzir_dia(dia: dict):
+    clima_esperado = await traduzir_condicao(
+        dia["day"]["condition"]["text"], dia["day"]["condition"].get("code")
+    )
+    data_nao_formatada = datetime.strptime(dia["date"], "%Y-%m-%d")
+    return {
+        "data": data_nao_formatada.strftime("%d/%m/%Y"),
+        "temp_maxima": formatar_numero(str(dia["day"]["maxtemp_c"])),
+        "temp_minima": formatar_numero(str(dia["day"]["mintemp_c"])),
+        "temp_media": formatar_numero(str(dia["day"]["avgtemp_c"])),
+        "clima_esperado": clima_esperado,
+    }
+
+
+async def atualizar_trecho(trecho: dict, dias_previsao_clima: int | None):
+    latitude = trecho["coordenadas"]["lat"]
+    longitude = trecho["coordenadas"]["lon"]
+    consultas = [
+        cep_service.consultar_trafego(
+            latitude, longitude, trecho["coordenadas"]["bounding_box"]
+        )
+    ]
+    if dias_previsao_clima:
+        consultas.append(
+            cep_service.consultar_previsao_clima(
+                latitude, longitude, dias_previsao_clima
+            )
+        )
+    (trafego_atual, trafego_em), *previsao = await asyncio.gather(*consultas)
+    trecho["trafego"] = trafego_atual
+    atualizado_em = trecho.pop("atualizado_em", {})
+    # Os horários são os da obtenção na API, e não os desta consulta, para que
+    # um valor servido do cache não pareça mais recente do que é.
+    atualizado_em["trafego"] = trafego_em
+    if previsao:
+        dias, clima_em = previsao[0]
+        trecho["clima"] = list(
+            await asyncio.gather(*(traduzir_dia(dia) for dia in dias))
+        )
+        atualizado_em["clima"] = clima_em
+    trecho["atualizado_em"] = atualizado_em
+    return trecho
+
+
+async def enriquecer_trecho(trecho: dict, reverso: dict, dias_previsao_clima: int):
+    if trecho["cep"] == "não fornecido":
+        return trecho
+    trecho["coordenadas"] = {
+        "lat": reverso["lat"],
+        "lon": reverso["lon"],
+        "bounding_box": reverso["boundingbox"],
+    }
+    return await atualizar_trecho(trecho, dias_previsao_clima)
+
+
+async def atualizar_trajeto(
+    trajeto: dict, incluir_clima: bool = False, dias_previsao_clima: int | None = None
+):
+    if dias_previsao_clima is not None:
+        validar_dias_previsao(dias_previsao_clima)
+
+    async def atualizar(trecho: dict):
+        if trecho.get("cep", "não fornecido") == "não fornecido":
+            return
+        if "coordenadas" not in trecho:
+            # Trajetos salvos antes de as coordenadas serem guardadas por
+            # trecho: localiza pelo CEP uma única vez e guarda para as próximas.
+            try:
+                coordenadas = await cep_service.obter_coordenadas(trecho["cep"])
+            except HTTPException:
+                return
+            trecho["coordenadas"] = {
+                "lat": coordenadas["lat"],
+                "lon": coordenadas["lon"],
+                "bounding_box": coordenadas["bounding_box"],
+            }
+        dias = None
+        if incluir_clima:
+            dias = dias_previsao_clima or len(trecho.get("clima", [])) or 14
+        await atualizar_trecho(trecho, dias)
+
+    await asyncio.gather(*(atualizar(trecho) for trecho in trajeto.get("rota", [])))
+    return trajeto
+
+
+def validar_dias_previsao(dias_previsao_clima: int):
+    if dias_previsao_clima < 1 or dias_previsao_clima > 14:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"1 à 14 dias de previsão esperado, informado: {dias_previsao_clima}. Informe um valor válido ou deixe em branco para retornar a previsão dos próximos 14 dias.",
+        )
+
+
+def _chave_trajeto(cep_origem, cep_destino, numero_origem, numero_destino, *extras):
+    return (
+        normalizar_cep(cep_origem),
+        normalizar_cep(cep_destino),
+        numero_origem or None,
+        numero_destino or None,
+        *extras,
+    )
+
+
+async def calcular_trajeto_simples(
+    cep_origem: str,
+    cep_destino: str,
+    numero_origem: str | None = None,
+    numero_destino: str | None = None,
+):
+    return await trajetos_simples.executar(
+        _chave_trajeto(cep_origem, cep_destino, numero_origem, numero_destino),
+        lambda: _calcular_trajeto_simples(
+            cep_origem, cep_destino, numero_origem, numero_destino
+        ),
+    )
+
+
+async def _calcular_trajeto_simples(
+    cep_origem: str,
+    cep_destino: str,
+    numero_origem: str | None = None,
+    numero_destino: str | None = None,
+):
+    coordenadas_origem, coordenadas_destino = await asyncio.gather(
+        cep_service.obter_coordenadas(cep_origem, numero_origem),
+        cep_service.obter_coordenadas(cep_destino, numero_destino),
+    )
+    trajeto_json = await calcular_rota(coordenadas_origem, coordenadas_destino)
+    return informacoes_basicas(trajeto_json)
+
+
+async def calcular_trajeto_completo(
+    cep_origem: str,
+    cep_destino: str,
+    numero_origem: str | None = None,
+    numero_destino: str | None = None,
+    dias_previsao_clima: int = 14,
+):
+    validar_dias_previsao(dias_previsao_clima)
+    return await trajetos_completos.executar(
+        _chave_trajeto(
+            cep_origem, cep_destino, numero_origem, numero_destino, dias_previsao_clima
+        ),
+        lambda: _calcular_trajeto_completo(
+            cep_origem, cep_destino, numero_origem, numero_destino, dias_previsao_clima
+        ),
+    )
+
+
+async def _calcular_trajeto_completo(
+    cep_origem: str,
+    cep_destino: str,
+    numero_origem: str | None = None,
+    numero_destino: str | None = None,
+    dias_previsao_clima: int = 14,
+):
+    coordenadas_origem, coordenadas_destino = await asyncio.gather(
+        cep_service.obter_coordenadas(cep_origem, numero_origem),
+        cep_service.obter_coordenadas(cep_destino, numero_destino),
+    )
+    trajeto_json = await calcular_rota(coordenadas_origem, coordenadas_destino)
+    trechos = await resolver_trechos(trajeto_json["routes"][0]["legs"][0]["points"])
+    rota = await asyncio.gather(
+        *(
+            enriquecer_trecho(trecho, reverso, dias_previsao_clima)
+            for trecho, reverso in trechos
+        )
+    )
+    return {
+        "informacoes_basicas": informacoes_basicas(trajeto_json),
+        "rota": list(rota),
+    }
+
+
+async def transmitir_trajeto_completo(
+    cep_origem: str,
+    cep_destino: str,
+    numero_origem: str | None = None,
+    numero_destino: str | None = None,
+    dias_previsao_clima: int = 14,
+):
+    validar_dias_previsao(dias_previsao_clima)
+    coordenadas_origem, coordenadas_destino = await asyncio.gather(
+        cep_service.obter_coordenadas(cep_origem, numero_origem),
+        cep_service.obter_coordenadas(cep_destino, numero_destino),
+    )
+    trajeto_json = await calcular_rota(coordenadas_origem, coordenadas_destino)
+    yield "informacoes_basicas", informacoes_basicas(trajeto_json)
+
+    trechos = await resolver_trechos(trajeto_json["routes"][0]["legs"][0]["points"])
+    del trajeto_json
+    yield "total_trechos", len(trechos)
+    tarefas = [
+        asyncio.create_task(enriquecer_trecho(trecho, reverso, dias_previsao_clima))
+        for trecho, reverso in trechos
+    ]
+    try:
+        for tarefa in tarefas:
+            yield "trecho", await tarefa
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+
+
+async def _geocodificar_ceps(ceps: list[str]):
+    async def geocodificar(cep: str):
+        try:
+            # O ViaCEP responde 200 com {"erro": true} para CEPs inexistentes;
+            # a consulta fica em cache e é reaproveitada por obter_coordenadas.
+            if "erro" in await cep_service.buscar_cep(cep):
+                return cep, "CEP não encontrado."
+            return cep, await cep_service.obter_coordenadas(cep)
+        except HTTPException as e:
+            return cep, e.detail
+
+    coordenadas, erros = {}, {}
+    for cep, resultado in await asyncio.gather(*(geocodificar(cep) for cep in ceps)):
+        if isinstance(resultado, dict):
+            coordenadas[cep] = resultado
+        else:
+            erros[cep] = resultado
+    return coordenadas, erros
+
+
+@medido("matriz")
+async def _calcular_bloco_matriz(origens: list[dict], destinos: list[dict]):
+    def ponto(coordenadas: dict):
+        return {
+            "point": {
+                "latitude": float(coordenadas["lat"]),
+                "longitude": float(coordenadas["lon"]),
+            }
+        }
+
+    response = await clients.fetch(
+        "tomtom",
+        f"{settings.TOMTOM_MATRIX_URL}?key={settings.TOMTOM_KEY}",
+        method="POST",
+        json={
+            "origins": [ponto(origem) for origem in origens],
+            "destinations": [ponto(destino) for destino in destinos],
+            "options": {"departAt": "now", "traffic": "live", "travelMode": "car"},
+        },
+    )
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Falha na API: Erro ao calcular a matriz de trajetos - {response.status_code}",
+        )
+    return response.json()["data"]
+
+
+async def calcular_matriz(origens: list[str], destinos: list[str]):
+    origens = [normalizar_cep(cep) for cep in origens]
+    destinos = [normalizar_cep(cep) for cep in destinos]
+    if len(set(origens)) > service_settings.MATRIZ_MAX_CEPS or (
+        len(set(destinos)) > service_settings.MATRIZ_MAX_CEPS
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"São permitidos até {service_settings.MATRIZ_MAX_CEPS} CEPs distintos de origem e de destino.",
+        )
+
+    coordenadas, erros = await _geocodificar_ceps(
+        list(dict.fromkeys(origens + destinos))
+    )
+    origens_validas = [cep for cep in dict.fromkeys(origens) if cep in coordenadas]
+    destinos_validos = [cep for cep in dict.fromkeys(destinos) if cep in coordenadas]
+
+    celulas = {}
+    if origens_validas and destinos_validos:
+        colunas = min(len(destinos_validos), settings.TOMTOM_MATRIX_MAX_CELULAS)
+        linhas = max(1, settings.TOMTOM_MATRIX_MAX_CELULAS // colunas)
+        blocos = [
+            (origens_validas[i : i + linhas], destinos_validos[j : j + colunas])
+            for i in range(0, len(origens_validas), linhas)
+            for j in range(0, len(destinos_validos), colunas)
+        ]
+        resultados = await asyncio.gather(
+            *(
+                _calcular_bloco_matriz(
+                    [coordenadas[cep] for cep in bloco_origens],
+                    [coordenadas[cep] for cep in bloco_destinos],
+                )
+                for bloco_origens, bloco_destinos in blocos
+            )
+        )
+        for (bloco_origens, bloco_destinos), dados in zip(blocos, resultados):
+            for celula in dados:
+                resumo = celula.get("routeSummary")
+                if resumo:
+                    origem = bloco_origens[celula["originIndex"]]
+                    destino = bloco_destinos[celula["destinationIndex"]]
+                    celulas[origem, destino] = resumo
+
+    def valor(origem: str, destino: str, campo: str, conversao):
+        resumo = celulas.get((origem, destino))
+        return conversao(resumo[campo]) if resumo else None
+
+    return {
+        "origens": origens,
+        "destinos": destinos,
+        "distancia_em_km": [
+            [
+                valor(origem, destino, "lengthInMeters", lambda m: round(m / 1000, 3))
+                for destino in destinos
+            ]
+            for origem in origens
+        ],
+        "tempo_estimado_em_minutos": [
+            [
+                valor(origem, destino, "travelTimeInSeconds", lambda s: ceil(s / 60))
+                for destino in destinos
+            ]
+            for origem in origens
+        ],
+        "erros": erros,
+    }
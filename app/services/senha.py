@@ -0,0 +1,74 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+from app.metricas import medido, medir
+from app.services.config import service_settings as settings
+
+ph = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM,
+)
+_executor = ThreadPoolExecutor(
+    max_workers=settings.ARGON2_WORKERS, thread_name_prefix="argon2"
+)
+_acessos_verificados: OrderedDict[str, float] = OrderedDict()
+
+
+def _chave_acesso(senha_hash: str, senha: str) -> str:
+    return hashlib.sha256(f"{senha_hash}\0{senha}".encode()).hexdigest()
+
+
+def _acesso_em_cache(chave: str) -> bool:
+    expira_em = _acessos_verificados.get(chave)
+    if expira_em is None:
+        return False
+    if expira_em < time.monotonic():
+        del _acessos_verificados[chave]
+        return False
+    _acessos_verificados.move_to_end(chave)
+    return True
+
+
+def _verificar(senha_hash: str, senha: str) -> bool:
+    try:
+        return ph.verify(senha_hash, senha)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def _registrar_acesso(chave: str):
+    if settings.ACESSO_CACHE_TTL_SEGUNDOS <= 0:
+        return
+    _acessos_verificados[chave] = time.monotonic() + settings.ACESSO_CACHE_TTL_SEGUNDOS
+    _acessos_verificados.move_to_end(chave)
+    while len(_acessos_verificados) > settings.ACESSO_CACHE_MAX_ENTRADAS:
+        _acessos_verificados.popitem(last=False)
+
+
+@medido("argon2")
+async def gerar_hash(senha: str) -> str:
+    senha_hash = await asyncio.get_running_loop().run_in_executor(
+        _executor, ph.hash, senha
+    )
+    _registrar_acesso(_chave_acesso(senha_hash, senha))
+    return senha_hash
+
+
+async def verificar_senha(senha_hash: str, senha: str) -> bool:
+    chave = _chave_acesso(senha_hash, senha)
+    if _acesso_em_cache(chave):
+        return True
+    with medir("argon2"):
+        valida = await asyncio.get_running_loop().run_in_executor(
+            _executor, _verificar, senha_hash, senha
+        )
+    if valida:
+        _registrar_acesso(chave)
+    return valida
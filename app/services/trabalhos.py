@@ -0,0 +1,250 @@
+import asyncio
+import logging
+from datetime import UTC, datetime, timedelta
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, or_, select, update
+
+from app.database.models import TrabalhoTrajeto, Trajeto
+from app.database.session import async_session
+from app.services import rota as rota_service
+from app.services.config import service_settings as settings
+from app.services.senha import gerar_hash
+from app.services.trajeto import TrajetoService
+
+logger = logging.getLogger(__name__)
+
+FINALIZADOS = ("concluido", "erro")
+TEMPORARIOS = (
+    status.HTTP_429_TOO_MANY_REQUESTS,
+    status.HTTP_502_BAD_GATEWAY,
+    status.HTTP_503_SERVICE_UNAVAILABLE,
+    status.HTTP_504_GATEWAY_TIMEOUT,
+)
+
+
+def _agora():
+    return datetime.now(UTC)
+
+
+def _retry_after(erro: HTTPException) -> float:
+    try:
+        return float((erro.headers or {}).get("Retry-After", 0))
+    except ValueError:
+        return 0.0
+
+
+class FilaTrabalhos:
+    def __init__(self):
+        self._tarefas: list[asyncio.Task] = []
+        self._novo_trabalho = asyncio.Event()
+
+    def start(self):
+        for _ in range(settings.TRABALHOS_WORKERS):
+            self._tarefas.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas.clear()
+
+    async def submeter(self, parametros: dict, senha_trajeto: str):
+        async with async_session() as session:
+            pendentes = await session.scalar(
+                select(func.count()).where(TrabalhoTrajeto.status == "pendente")
+            )
+            if pendentes >= settings.TRABALHOS_MAX_PENDENTES:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Fila de trajetos cheia, tente novamente em instantes.",
+                    headers={"Retry-After": "30"},
+                )
+            agora = _agora()
+            trabalho = TrabalhoTrajeto(
+                id=uuid4(),
+                parametros=parametros,
+                senha=await gerar_hash(senha_trajeto),
+                criado_em=agora,
+                atualizado_em=agora,
+            )
+            session.add(trabalho)
+            await session.commit()
+        self._novo_trabalho.set()
+        return {"id": trabalho.id, "status": trabalho.status}
+
+    async def consultar(self, id: UUID, espera: float = 0):
+        limite = asyncio.get_running_loop().time() + min(
+            espera, settings.TRABALHOS_ESPERA_MAXIMA_SEGUNDOS
+        )
+        while True:
+            async with async_session() as session:
+                trabalho = await session.get(TrabalhoTrajeto, id)
+            if trabalho is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Trabalho não encontrado.",
+                )
+            restante = limite - asyncio.get_running_loop().time()
+            if trabalho.status in FINALIZADOS or restante <= 0:
+                return {
+                    "id": trabalho.id,
+                    "status": trabalho.status,
+                    "progresso": {
+                        "trechos_concluidos": trabalho.trechos_concluidos,
+                        "total_trechos": trabalho.total_trechos,
+                    },
+                    "erro": trabalho.erro,
+                    "criado_em": trabalho.criado_em,
+                    "atualizado_em": trabalho.atualizado_em,
+                }
+            await asyncio.sleep(min(0.5, restante))
+
+    async def _reivindicar(self):
+        agora = _agora()
+        expirados = agora - timedelta(seconds=settings.TRABALHOS_LEASE_SEGUNDOS)
+        proximo = (
+            select(TrabalhoTrajeto.id)
+            .where(
+                or_(
+                    and_(
+                        TrabalhoTrajeto.status == "pendente",
+                        or_(
+                            TrabalhoTrajeto.disponivel_em.is_(None),
+                            TrabalhoTrajeto.disponivel_em <= agora,
+                        ),
+                    ),
+                    and_(
+                        TrabalhoTrajeto.status == "executando",
+                        TrabalhoTrajeto.atualizado_em < expirados,
+                    ),
+                )
+            )
+            .order_by(TrabalhoTrajeto.criado_em)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        comando = (
+            update(TrabalhoTrajeto)
+            .where(TrabalhoTrajeto.id == proximo)
+            .values(
+                status="executando",
+                tentativas=TrabalhoTrajeto.tentativas + 1,
+                trechos_concluidos=0,
+                atualizado_em=agora,
+            )
+            .returning(
+                TrabalhoTrajeto.id,
+                TrabalhoTrajeto.parametros,
+                TrabalhoTrajeto.senha,
+                TrabalhoTrajeto.tentativas,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with async_session() as session:
+            trabalho = (await session.execute(comando)).one_or_none()
+            await session.commit()
+        return trabalho
+
+    async def _atualizar(self, id: UUID, **valores):
+        async with async_session() as session:
+            await session.execute(
+                update(TrabalhoTrajeto)
+                .where(TrabalhoTrajeto.id == id)
+                .values(atualizado_em=_agora(), **valores)
+            )
+            await session.commit()
+
+    async def _executar(self, id: UUID, parametros: dict, senha_hash: str):
+        async with async_session() as session:
+            salvo = await session.scalar(select(Trajeto.id).where(Trajeto.id == id))
+        if salvo:
+            await self._atualizar(id, status="concluido")
+            return
+        informacoes_basicas, rota = None, []
+        async for tipo, dados in rota_service.transmitir_trajeto_completo(**parametros):
+            if tipo == "informacoes_basicas":
+                informacoes_basicas = dados
+            elif tipo == "total_trechos":
+                await self._atualizar(id, total_trechos=dados)
+            else:
+                rota.append(dados)
+                await self._atualizar(id, trechos_concluidos=len(rota))
+        async with async_session() as session:
+            await TrajetoService(session).add_trajeto(
+                None,
+                {"informacoes_basicas": informacoes_basicas, "rota": rota},
+                id=id,
+                senha_hash=senha_hash,
+            )
+        await self._atualizar(id, status="concluido")
+
+    async def _reagendar(self, trabalho, espera_minima: float = 0):
+        # Espera crescente entre tentativas, respeitando o Retry-After do
+        # provedor (ou do circuit breaker) quando ele for maior.
+        espera = min(
+            settings.TRABALHOS_BACKOFF_SEGUNDOS * 2 ** (trabalho.tentativas - 1),
+            settings.TRABALHOS_BACKOFF_MAXIMO_SEGUNDOS,
+        )
+        await self._atualizar(
+            trabalho.id,
+            status="pendente",
+            disponivel_em=_agora() + timedelta(seconds=max(espera, espera_minima)),
+        )
+
+    async def _processar_proximo(self):
+        trabalho = await self._reivindicar()
+        if trabalho is None:
+            self._novo_trabalho.clear()
+            try:
+                await asyncio.wait_for(
+                    self._novo_trabalho.wait(),
+                    settings.TRABALHOS_INTERVALO_BUSCA_SEGUNDOS,
+                )
+            except TimeoutError:
+                pass
+            return
+        try:
+            await self._executar(trabalho.id, trabalho.parametros, trabalho.senha)
+        except asyncio.CancelledError:
+            await asyncio.shield(self._atualizar(trabalho.id, status="pendente"))
+            raise
+        except HTTPException as e:
+            # Erros de entrada (CEP inválido etc.) são definitivos; os de
+            # indisponibilidade momentânea (circuito aberto, limite do
+            # provedor, timeout) voltam para a fila como as demais falhas.
+            if (
+                e.status_code not in TEMPORARIOS
+                or trabalho.tentativas >= settings.TRABALHOS_MAX_TENTATIVAS
+            ):
+                await self._atualizar(trabalho.id, status="erro", erro=str(e.detail))
+            else:
+                await self._reagendar(trabalho, _retry_after(e))
+        except Exception as e:
+            logger.exception("Falha ao processar o trabalho %s", trabalho.id)
+            if trabalho.tentativas >= settings.TRABALHOS_MAX_TENTATIVAS:
+                await self._atualizar(trabalho.id, status="erro", erro=repr(e))
+            else:
+                await self._reagendar(trabalho)
+
+    async def _worker(self):
+        espera = settings.TRABALHOS_INTERVALO_BUSCA_SEGUNDOS
+        while True:
+            try:
+                await self._processar_proximo()
+                espera = settings.TRABALHOS_INTERVALO_BUSCA_SEGUNDOS
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Falha do próprio banco (reinício, pool esgotado): o worker
+                # continua vivo e tenta de novo com espera crescente.
+                logger.exception(
+                    "Falha no worker de trajetos; nova tentativa em %ss", espera
+                )
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 60)
+
+
+fila_trabalhos = FilaTrabalhos()
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
+import httpx
+from googletrans import Translator
+
+from app.apis import clients
+from app.metricas import medido
+
+logger = logging.getLogger(__name__)
+
+translator = Translator()
+
+# Condições da WeatherAPI (https://www.weatherapi.com/docs/weather_conditions.json),
+# pelo texto diurno, que é o usado nas previsões por dia.
+CONDICOES = {
+    1000: "Ensolarado",
+    1003: "Parcialmente nublado",
+    1006: "Nublado",
+    1009: "Encoberto",
+    1030: "Névoa",
+    1063: "Chuva irregular nas proximidades",
+    1066: "Neve irregular nas proximidades",
+    1069: "Chuva com neve irregular nas proximidades",
+    1072: "Garoa congelante irregular nas proximidades",
+    1087: "Possibilidade de trovoadas",
+    1114: "Neve com vento",
+    1117: "Nevasca",
+    1135: "Nevoeiro",
+    1147: "Nevoeiro congelante",
+    1150: "Garoa fraca irregular",
+    1153: "Garoa fraca",
+    1168: "Garoa congelante",
+    1171: "Garoa congelante forte",
+    1180: "Chuva fraca irregular",
+    1183: "Chuva fraca",
+    1186: "Chuva moderada em alguns momentos",
+    1189: "Chuva moderada",
+    1192: "Chuva forte em alguns momentos",
+    1195: "Chuva forte",
+    1198: "Chuva congelante fraca",
+    1201: "Chuva congelante moderada ou forte",
+    1204: "Chuva com neve fraca",
+    1207: "Chuva com neve moderada ou forte",
+    1210: "Neve fraca irregular",
+    1213: "Neve fraca",
+    1216: "Neve moderada irregular",
+    1219: "Neve moderada",
+    1222: "Neve forte irregular",
+    1225: "Neve forte",
+    1237: "Granizo",
+    1240: "Pancadas de chuva fracas",
+    1243: "Pancadas de chuva moderadas ou fortes",
+    1246: "Pancadas de chuva torrenciais",
+    1249: "Pancadas de chuva com neve fracas",
+    1252: "Pancadas de chuva com neve moderadas ou fortes",
+    1255: "Pancadas de neve fracas",
+    1258: "Pancadas de neve moderadas ou fortes",
+    1261: "Pancadas de granizo fracas",
+    1264: "Pancadas de granizo moderadas ou fortes",
+    1273: "Chuva fraca irregular com trovoadas",
+    1276: "Chuva moderada ou forte com trovoadas",
+    1279: "Neve fraca irregular com trovoadas",
+    1282: "Neve moderada ou forte com trovoadas",
+}
+
+# Textos que não seguem o código, como o noturno de 1000.
+TEXTOS = {"clear": "Céu limpo"}
+
+MAX_MEMORIZADAS = 1024
+
+_memorizadas: OrderedDict[str, str] = OrderedDict()
+_pendentes: dict[str, asyncio.Future] = {}
+_tarefas: set[asyncio.Task] = set()
+
+
+def _memorizar(texto: str, traducao: str):
+    _memorizadas[texto] = traducao
+    _memorizadas.move_to_end(texto)
+    while len(_memorizadas) > MAX_MEMORIZADAS:
+        _memorizadas.popitem(last=False)
+
+
+async def _traduzir_pendentes():
+    # Cede a vez uma vez para que os trechos da mesma rota enfileirem seus
+    # textos e todos sigam juntos numa única chamada ao googletrans.
+    await asyncio.sleep(0)
+    pendentes = dict(_pendentes)
+    _pendentes.clear()
+    textos = list(pendentes)
+    try:
+        async with clients.get_semaphore("googletrans"):
+            traduzidos = await _traduzir_em_bloco(textos)
+    except (httpx.HTTPError, ValueError, IndexError, TypeError):
+        # Falha de rede ou resposta fora do formato esperado pelo googletrans:
+        # a previsão segue com o texto original, sem memorizá-lo, para que a
+        # próxima consulta tente traduzir de novo.
+        logger.warning(
+            "Falha ao traduzir %d condições do clima; usando o texto original",
+            len(textos),
+            exc_info=True,
+        )
+        for texto, futuro in pendentes.items():
+            futuro.set_result(texto)
+        return
+    except BaseException as erro:
+        # Quem aguarda os textos não pode ficar esperando para sempre.
+        for futuro in pendentes.values():
+            if isinstance(erro, asyncio.CancelledError):
+                futuro.cancel()
+            else:
+                futuro.set_exception(erro)
+        raise
+    for texto, traduzido in zip(textos, traduzidos):
+        _memorizar(texto, traduzido)
+        pendentes[texto].set_result(traduzido)
+
+
+async def _traduzir_em_bloco(textos: list[str]) -> list[str]:
+    # O googletrans faz uma requisição por item quando recebe uma lista; os
+    # textos vão juntos, um por linha, numa única requisição.
+    traduzido = await translator.translate("\n".join(textos), src="en", dest="pt")
+    linhas = [linha.strip() for linha in traduzido.text.split("\n")]
+    if len(linhas) == len(textos):
+        return linhas
+    # O tradutor juntou ou dividiu linhas: traduz cada texto separadamente.
+    return [
+        resultado.text
+        for resultado in await translator.translate(textos, src="en", dest="pt")
+    ]
+
+
+@medido("traducao")
+async def traduzir_condicao(texto: str, codigo: int | None = None) -> str:
+    chave = texto.strip()
+    traducao = TEXTOS.get(chave.lower()) or CONDICOES.get(codigo)
+    if traducao:
+        return traducao
+    if chave in _memorizadas:
+        _memorizadas.move_to_end(chave)
+        return _memorizadas[chave]
+    futuro = _pendentes.get(chave)
+    if futuro is None:
+        if not _pendentes:
+            tarefa = asyncio.create_task(_traduzir_pendentes())
+            _tarefas.add(tarefa)
+            tarefa.add_done_callback(_tarefas.discard)
+        futuro = asyncio.get_running_loop().create_future()
+        _pendentes[chave] = futuro
+    return await asyncio.shield(futuro)
@@ -1,24 +1,64 @@
+import json
+import zlib
 from uuid import UUID, uuid4
-import argon2
 from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, func, literal_column, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
+from app.database.config import database_settings
 from app.database.models import Trajeto
-from argon2 import PasswordHasher
+from app.services.senha import gerar_hash, verificar_senha
 
-ph = PasswordHasher()
+
+def comprimir_trajeto(trajeto: dict):
+    if not database_settings.TRAJETO_COMPRESSAO_ATIVA:
+        return trajeto, None
+    serializado = json.dumps(trajeto, ensure_ascii=False, default=str).encode()
+    if len(serializado) < database_settings.TRAJETO_COMPRESSAO_MIN_BYTES:
+        return trajeto, None
+    return None, zlib.compress(serializado)
+
+
+def descomprimir_trajeto(dados_trajeto: dict | None, comprimido: bytes | None):
+    if comprimido is not None:
+        return json.loads(zlib.decompress(comprimido))
+    return dados_trajeto
 
 
 class TrajetoService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def add_trajeto(self, senha_trajeto: str, trajeto: dict):
+    async def _verificar_acesso(self, id: UUID, senha_trajeto: str, *colunas):
+        resultado = await self.session.execute(
+            select(Trajeto.senha, *colunas).where(Trajeto.id == id)
+        )
+        linha = resultado.one_or_none()
+        # Encerra a transação de leitura para devolver a conexão ao pool antes
+        # do argon2 e do que vier depois (atualização de tráfego, IA); as
+        # escritas abrem uma transação curta própria.
+        await self.session.commit()
+        if linha and await verificar_senha(linha[0], senha_trajeto):
+            return linha[1:]
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Não foram encontrados trajetos armazenados com as informações fornecidas.",
+        )
+
+    async def add_trajeto(
+        self,
+        senha_trajeto: str | None,
+        trajeto: dict,
+        id: UUID | None = None,
+        senha_hash: str | None = None,
+    ):
+        dados_trajeto, comprimido = comprimir_trajeto(trajeto)
         novo_trajeto = Trajeto(
-            id=uuid4(),
-            senha=ph.hash(senha_trajeto),
-            dados_trajeto=trajeto,
+            id=id or uuid4(),
+            senha=senha_hash or await gerar_hash(senha_trajeto),
+            dados_trajeto=dados_trajeto,
+            dados_trajeto_comprimido=comprimido,
             insights=None,
         )
         self.session.add(novo_trajeto)
@@ -29,62 +69,68 @@ class TrajetoService:
         }
 
     async def get_trajeto(self, id: UUID, senha_trajeto: str):
-        trajeto = await self.session.execute(select(Trajeto).where(Trajeto.id == id))
-        trajeto_formatado = trajeto.scalar_one_or_none()
-        try:
-            if trajeto_formatado and ph.verify(trajeto_formatado.senha, senha_trajeto):
-                return trajeto_formatado
-        except argon2.exceptions.VerifyMismatchError:
-            pass
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Não foram encontrados trajetos armazenados com as informações fornecidas.",
+        dados_trajeto, comprimido, insights = await self._verificar_acesso(
+            id,
+            senha_trajeto,
+            Trajeto.dados_trajeto,
+            Trajeto.dados_trajeto_comprimido,
+            Trajeto.insights,
+        )
+        return {
+            "id": id,
+            "dados_trajeto": descomprimir_trajeto(dados_trajeto, comprimido),
+            "insights": insights,
+        }
+
+    async def update_trajeto(self, id: UUID, senha_trajeto: str, trajeto: dict):
+        await self._verificar_acesso(id, senha_trajeto)
+        dados_trajeto, comprimido = comprimir_trajeto(trajeto)
+        await self.session.execute(
+            update(Trajeto)
+            .where(Trajeto.id == id)
+            .values(dados_trajeto=dados_trajeto, dados_trajeto_comprimido=comprimido)
         )
+        await self.session.commit()
+        return trajeto
 
     async def add_insight(self, id: UUID, senha_trajeto: str, resposta_formatada: dict):
-        trajeto = await self.session.execute(select(Trajeto).where(Trajeto.id == id))
-        trajeto_formatado = trajeto.scalar_one_or_none()
-        try:
-            if trajeto_formatado and ph.verify(trajeto_formatado.senha, senha_trajeto):
-                trajeto_formatado.insights = resposta_formatada
-                self.session.add(trajeto_formatado)
-                await self.session.commit()
-                await self.session.refresh(trajeto_formatado)
-                return resposta_formatada
-        except argon2.exceptions.VerifyMismatchError:
-            pass
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Não foram encontrados trajetos armazenados com as informações fornecidas.",
+        await self._verificar_acesso(id, senha_trajeto)
+        await self.session.execute(
+            update(Trajeto).where(Trajeto.id == id).values(insights=resposta_formatada)
         )
+        await self.session.commit()
+        return resposta_formatada
 
     async def get_insight(self, id: UUID, senha_trajeto: str):
-        trajeto = await self.get_trajeto(id, senha_trajeto)
-        if not trajeto or not trajeto.insights:
+        (insights,) = await self._verificar_acesso(id, senha_trajeto, Trajeto.insights)
+        if not insights:
             return {
                 "detail": "Não foram encontrados insights para o trajeto fornecido."
             }
         else:
-            return trajeto.insights
+            return insights
 
     async def delete_trajeto(self, id: UUID, senha_trajeto: str):
-        trajeto = await self.get_trajeto(id, senha_trajeto)
-        if trajeto:
-            await self.session.delete(trajeto)
-            await self.session.commit()
-            return {"detail": f"Trajeto de id {id} removido."}
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trajeto não encontrado com as informações fornecidas.",
-        )
+        await self._verificar_acesso(id, senha_trajeto)
+        await self.session.execute(delete(Trajeto).where(Trajeto.id == id))
+        await self.session.commit()
+        return {"detail": f"Trajeto de id {id} removido."}
 
     async def delete_insight(self, id: UUID, senha_trajeto: str):
-        trajeto = await self.get_trajeto(id, senha_trajeto)
-        if trajeto and trajeto.insights:
-            trajeto.insights = None
-            self.session.add(trajeto)
+        (possui_insights,) = await self._verificar_acesso(
+            id,
+            senha_trajeto,
+            # Como em get_insight, um objeto vazio conta como sem insights.
+            and_(
+                func.coalesce(func.jsonb_typeof(Trajeto.insights), "null") != "null",
+                Trajeto.insights != literal_column("'{}'::jsonb"),
+            ),
+        )
+        if possui_insights:
+            await self.session.execute(
+                update(Trajeto).where(Trajeto.id == id).values(insights=None)
+            )
             await self.session.commit()
-            await self.session.refresh(trajeto)
             return {"detail": f"Insight removido para o trajeto de id {id}"}
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,4 +1,10 @@
 import re
+from math import asin, cos, radians, sin, sqrt
+from operator import itemgetter
+
+import numpy as np
+
+RAIO_TERRA_METROS = 6_371_000
 
 
 def limpar_resposta(texto: str):
@@ -12,6 +18,20 @@ def formatar_numero(texto: str):
     return texto
 
 
+def normalizar_cep(cep: str):
+    digitos = re.sub(r"\D", "", cep)
+    return digitos if len(digitos) == 8 else cep
+
+
+def distancia_haversine(lat1: float, lon1: float, lat2: float, lon2: float):
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = (
+        sin((lat2 - lat1) / 2) ** 2
+        + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * RAIO_TERRA_METROS * asin(sqrt(a))
+
+
 def comprimir_pontos_da_rota(pontos, max_ceps: int = 30):
     n = len(pontos)
     if n == 0:
@@ -43,3 +63,53 @@ def comprimir_pontos_da_rota(pontos, max_ceps: int = 30):
 
     filtrado = [pontos[i] for i in unique_indices]
     return filtrado
+
+
+def distancias_acumuladas(pontos):
+    lat = np.radians(
+        np.fromiter(map(itemgetter("latitude"), pontos), np.float64, len(pontos))
+    )
+    lon = np.radians(
+        np.fromiter(map(itemgetter("longitude"), pontos), np.float64, len(pontos))
+    )
+    a = (
+        np.sin(np.diff(lat) / 2) ** 2
+        + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    )
+    segmentos = 2 * RAIO_TERRA_METROS * np.arcsin(np.sqrt(a))
+    return np.concatenate(([0.0], np.cumsum(segmentos)))
+
+
+def distancias_ate(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray):
+    lat, lon = radians(lat), radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = (
+        np.sin((lats - lat) / 2) ** 2
+        + cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    )
+    return 2 * RAIO_TERRA_METROS * np.arcsin(np.sqrt(a))
+
+
+def simplificar_rota(
+    pontos,
+    espacamento_metros: float = 5000.0,
+    min_pontos: int = 2,
+    max_pontos: int = 30,
+):
+    n = len(pontos)
+    if n <= min(min_pontos, 2):
+        return list(pontos)
+
+    acumulado = distancias_acumuladas(pontos)
+    total = acumulado[-1]
+    quantidade = int(round(total / espacamento_metros)) + 1
+    quantidade = max(min_pontos, min(quantidade, max_pontos, n))
+
+    alvos = np.linspace(0.0, total, quantidade)
+    indices = np.searchsorted(acumulado, alvos, side="left")
+    indices = np.unique(np.clip(indices, 0, n - 1))
+    if indices[0] != 0:
+        indices = np.insert(indices, 0, 0)
+    if indices[-1] != n - 1:
+        indices = np.append(indices, n - 1)
+    return [pontos[i] for i in indices.tolist()]
@@ -0,0 +1,320 @@
+"""Teste de carga da API contra APIs de apoio falsas.
+
+Sobe benchmarks.carga.upstreams e app.main:app com uvicorn em portas locais,
+aponta as URLs do APIConfiguration para as APIs falsas e dispara cada
+cenário com os níveis de concorrência pedidos. O banco usado é o de
+DATABASE_URL (DatabaseSettings), que precisa estar acessível.
+
+Uso (na raiz do repositório):
+
+    python -m benchmarks.carga --concorrencia 1,10,50 --requisicoes 200
+    python -m benchmarks.carga --cenarios cep_buscar,trajeto_completo --saida resultado.json
+
+Os CEPs e pares de trajeto vêm de uma semente fixa, e os cenários rodam
+sempre na mesma ordem, então resultados de commits diferentes são
+comparáveis desde que os parâmetros sejam os mesmos.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parents[2]
+
+CENARIOS = (
+    "cep_buscar",
+    "cep_coordenadas",
+    "cep_referencias",
+    "cep_trafego",
+    "trajeto_simples",
+    "trajeto_completo",
+    "insights_criar",
+    "insights_retornar",
+)
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def ambiente_da_api(base: str) -> dict:
+    return {
+        "VIACEP_URL": f"{base}/viacep/ws",
+        "LOCATIONIQ_URL": f"{base}/locationiq/v1/search?key=carga",
+        "LOCATIONIQ_REVERSE_GEOCODING_URL": f"{base}/locationiq/v1/reverse.php?key=",
+        "LOCATIONIQ_KEY": "carga",
+        "OVERPASS_URL": f'{base}/overpass/api/interpreter?data=[out:json];node["amenity"](around:',
+        "TOMTOM_URL": f"{base}/tomtom/traffic/services/4",
+        "TOMTOM_ROUTING_URL": f"{base}/tomtom/routing/1",
+        "TOMTOM_MATRIX_URL": f"{base}/tomtom/routing/matrix/2",
+        "TOMTOM_KEY": "carga",
+        "WEATHER_API_URL": f"{base}/weatherapi/v1/forecast.json?key=",
+        "WEATHER_API_KEY": "carga",
+        "GEMINI_KEY": "carga",
+        "GEMINI_MODEL": "gemini-carga",
+        "GEMINI_BASE_URL": f"{base}/gemini",
+        "PROMPT_BASE": "Responda usando JSON válido. {dados_trajeto}",
+    }
+
+
+def iniciar(modulo: str, porta: int, ambiente: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            modulo,
+            "--port",
+            str(porta),
+            "--log-level",
+            "warning",
+        ],
+        cwd=RAIZ,
+        env={**os.environ, **ambiente},
+    )
+
+
+async def aguardar(cliente: httpx.AsyncClient, url: str, processo: subprocess.Popen):
+    for _ in range(300):
+        if processo.poll() is not None:
+            raise SystemExit(f"Processo encerrou antes de responder em {url}.")
+        try:
+            await cliente.get(url)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise SystemExit(f"Tempo esgotado aguardando {url}.")
+
+
+def gerar_ceps(quantidade: int, semente: int) -> list[str]:
+    gerador = random.Random(semente)
+    return [
+        f"{gerador.randrange(1_000_000, 20_000_000):08d}" for _ in range(quantidade)
+    ]
+
+
+def montar_requisicoes(
+    cenario: str, total: int, ceps: list[str], trajeto: dict, semente
+):
+    gerador = random.Random(f"{semente}:{cenario}")
+    for _ in range(total):
+        cep, outro = gerador.choice(ceps), gerador.choice(ceps)
+        if cenario == "cep_buscar":
+            yield "GET", f"/cep/buscar/{cep}"
+        elif cenario == "cep_coordenadas":
+            yield "GET", f"/cep/coordenadas/{cep}"
+        elif cenario == "cep_referencias":
+            yield "GET", f"/cep/referencias/{cep}"
+        elif cenario == "cep_trafego":
+            yield "GET", f"/cep/trafego/{cep}"
+        elif cenario == "trajeto_simples":
+            yield "GET", f"/trajeto/simples?cep_origem={cep}&cep_destino={outro}"
+        elif cenario == "trajeto_completo":
+            yield (
+                "GET",
+                f"/trajeto/completo?cep_origem={cep}&cep_destino={outro}&dias_previsao_clima=3",
+            )
+        elif cenario == "insights_criar":
+            yield (
+                "POST",
+                f"/insights/criar_com_ia?id={trajeto['id']}&senha_trajeto={trajeto['senha']}",
+            )
+        elif cenario == "insights_retornar":
+            yield (
+                "GET",
+                f"/insights/retornar?id={trajeto['id']}&senha_trajeto={trajeto['senha']}",
+            )
+
+
+async def executar_cenario(
+    api: httpx.AsyncClient,
+    upstream: httpx.AsyncClient,
+    requisicoes: list[tuple[str, str]],
+    concorrencia: int,
+):
+    fila = list(reversed(requisicoes))
+    latencias, erros = [], 0
+
+    async def trabalhador():
+        nonlocal erros
+        while fila:
+            metodo, caminho = fila.pop()
+            inicio = time.perf_counter()
+            try:
+                resposta = await api.request(metodo, caminho)
+                falhou = resposta.status_code >= 500
+            except httpx.HTTPError:
+                falhou = True
+            latencias.append(time.perf_counter() - inicio)
+            erros += falhou
+
+    antes = (await upstream.get("/_chamadas")).json()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+    depois = (await upstream.get("/_chamadas")).json()
+
+    chamadas = {
+        provider: depois[provider] - antes.get(provider, 0)
+        for provider in depois
+        if depois[provider] - antes.get(provider, 0)
+    }
+    p50, p95, p99 = np.percentile(np.array(latencias) * 1000, [50, 95, 99])
+    return {
+        "concorrencia": concorrencia,
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "rps": round(len(latencias) / duracao, 2),
+        "chamadas_por_requisicao": round(sum(chamadas.values()) / len(latencias), 3),
+        "chamadas_por_provedor": chamadas,
+    }
+
+
+def commit_atual() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(argumentos):
+    porta_upstream, porta_api = porta_livre(), porta_livre()
+    base = f"http://127.0.0.1:{porta_upstream}"
+    ambiente_fake = {
+        "FAKE_LATENCIA_MS": str(argumentos.latencia_ms),
+        "FAKE_JITTER_MS": str(argumentos.jitter_ms),
+        "FAKE_TAXA_ERRO": str(argumentos.taxa_erro),
+    }
+    ambiente_api = ambiente_da_api(base)
+    if argumentos.sem_limites:
+        for prefixo in ("VIACEP", "LOCATIONIQ", "OVERPASS", "TOMTOM", "WEATHER_API"):
+            ambiente_api[f"{prefixo}_RATE_LIMIT"] = "0"
+
+    processos = [
+        iniciar("benchmarks.carga.upstreams:app", porta_upstream, ambiente_fake),
+        iniciar("app.main:app", porta_api, ambiente_api),
+    ]
+    resultados = []
+    try:
+        limites = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with (
+            httpx.AsyncClient(base_url=base, timeout=30) as upstream,
+            httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{porta_api}", timeout=120, limits=limites
+            ) as api,
+        ):
+            await aguardar(upstream, "/_chamadas", processos[0])
+            await aguardar(api, "/openapi.json", processos[1])
+
+            ceps = gerar_ceps(argumentos.ceps, argumentos.semente)
+            senha = "carga"
+            criado = await api.get(
+                f"/trajeto/completo?cep_origem={ceps[0]}&cep_destino={ceps[1]}"
+                f"&dias_previsao_clima=3&senha_trajeto={senha}"
+            )
+            criado.raise_for_status()
+            trajeto = {"id": criado.json()["dados_para_busca"]["id"], "senha": senha}
+            await api.post(
+                f"/insights/criar_com_ia?id={trajeto['id']}&senha_trajeto={senha}&salvar_no_banco=1"
+            )
+
+            print(
+                f"{'cenário':<20}{'conc.':>6}{'req.':>6}{'erros':>7}{'p50 ms':>10}"
+                f"{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'chamadas/req':>14}"
+            )
+            for cenario in argumentos.cenarios:
+                for concorrencia in argumentos.concorrencia:
+                    requisicoes = list(
+                        montar_requisicoes(
+                            cenario,
+                            argumentos.requisicoes,
+                            ceps,
+                            trajeto,
+                            f"{argumentos.semente}:{concorrencia}",
+                        )
+                    )
+                    resultado = {
+                        "cenario": cenario,
+                        **await executar_cenario(
+                            api, upstream, requisicoes, concorrencia
+                        ),
+                    }
+                    resultados.append(resultado)
+                    print(
+                        f"{cenario:<20}{concorrencia:>6}{resultado['requisicoes']:>6}"
+                        f"{resultado['erros']:>7}{resultado['p50_ms']:>10.1f}"
+                        f"{resultado['p95_ms']:>10.1f}{resultado['p99_ms']:>10.1f}"
+                        f"{resultado['rps']:>9.1f}{resultado['chamadas_por_requisicao']:>14.3f}"
+                    )
+    finally:
+        for processo in processos:
+            processo.terminate()
+        for processo in processos:
+            processo.wait()
+
+    if argumentos.saida:
+        Path(argumentos.saida).write_text(
+            json.dumps(
+                {
+                    "commit": commit_atual(),
+                    "parametros": {
+                        chave: valor
+                        for chave, valor in vars(argumentos).items()
+                        if chave != "saida"
+                    },
+                    "resultados": resultados,
+                },
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+
+
+def _lista(tipo):
+    return lambda valor: [tipo(item) for item in valor.split(",") if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cenarios", type=_lista(str), default=list(CENARIOS))
+    parser.add_argument("--concorrencia", type=_lista(int), default=[1, 10, 50])
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument(
+        "--ceps", type=int, default=500, help="tamanho do conjunto de CEPs"
+    )
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument(
+        "--sem-limites",
+        action="store_true",
+        help="desativa os limites de requisições por segundo dos provedores",
+    )
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    argumentos = parser.parse_args()
+    invalidos = set(argumentos.cenarios) - set(CENARIOS)
+    if invalidos:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(invalidos))}")
+    asyncio.run(main(argumentos))
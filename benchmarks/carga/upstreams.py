@@ -0,0 +1,272 @@
+"""APIs de apoio falsas para os testes de carga.
+
+Respondem nos mesmos formatos do ViaCEP, LocationIQ, Overpass, TomTom,
+WeatherAPI e Gemini, com dados determinísticos derivados da própria
+consulta. Latência, variação e taxa de erro vêm das variáveis de ambiente
+FAKE_LATENCIA_MS, FAKE_JITTER_MS e FAKE_TAXA_ERRO, que podem ser
+sobrescritas por provedor (ex.: FAKE_TOMTOM_LATENCIA_MS).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+from collections import Counter
+from math import asin, cos, radians, sin, sqrt
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+chamadas: Counter[str] = Counter()
+
+
+def _parametro(provider: str, nome: str, padrao: float) -> float:
+    valor = os.environ.get(f"FAKE_{provider.upper()}_{nome}") or os.environ.get(
+        f"FAKE_{nome}"
+    )
+    return float(valor) if valor else padrao
+
+
+async def _simular(provider: str):
+    chamadas[provider] += 1
+    latencia = _parametro(provider, "LATENCIA_MS", 50)
+    jitter = _parametro(provider, "JITTER_MS", 20)
+    await asyncio.sleep(max(latencia + random.uniform(-jitter, jitter), 0) / 1000)
+    if random.random() < _parametro(provider, "TAXA_ERRO", 0.0):
+        return JSONResponse({"erro": "falha simulada"}, status_code=503)
+    return None
+
+
+def _numero(texto: str, modulo: int) -> int:
+    return int(hashlib.sha256(texto.encode()).hexdigest()[:12], 16) % modulo
+
+
+def _coordenadas(texto: str) -> tuple[float, float]:
+    return (
+        -24.0 + _numero(texto + "lat", 40_000) / 10_000,
+        -50.0 + _numero(texto + "lon", 50_000) / 10_000,
+    )
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = (
+        sin((lat2 - lat1) / 2) ** 2
+        + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * 6_371_000 * asin(sqrt(a))
+
+
+@app.get("/_chamadas")
+async def contagem():
+    return dict(chamadas)
+
+
+@app.get("/viacep/ws/{cep}/json/")
+async def viacep(cep: str):
+    if erro := await _simular("viacep"):
+        return erro
+    cep = cep.replace("-", "")
+    if not (len(cep) == 8 and cep.isdigit()):
+        return JSONResponse({"erro": "CEP inválido"}, status_code=400)
+    if cep.startswith("000"):
+        return {"erro": "true"}
+    return {
+        "cep": f"{cep[:5]}-{cep[5:]}",
+        "logradouro": f"Rua {_numero(cep, 3000)}",
+        "complemento": "",
+        "bairro": f"Bairro {_numero(cep[:6], 200)}",
+        "localidade": f"Cidade {cep[:3]}",
+        "uf": "SP",
+        "ibge": str(3_500_000 + int(cep[:3])),
+        "ddd": "11",
+    }
+
+
+@app.get("/locationiq/v1/search")
+async def locationiq_busca(q: str):
+    if erro := await _simular("locationiq"):
+        return erro
+    lat, lon = _coordenadas(q)
+    return [
+        {
+            "lat": f"{lat:.7f}",
+            "lon": f"{lon:.7f}",
+            "display_name": q,
+            "class": "highway",
+            "type": "residential",
+            "boundingbox": [
+                f"{lat - 0.002:.7f}",
+                f"{lat + 0.002:.7f}",
+                f"{lon - 0.002:.7f}",
+                f"{lon + 0.002:.7f}",
+            ],
+        }
+    ]
+
+
+@app.get("/locationiq/v1/reverse.php")
+async def locationiq_reversa(lat: float, lon: float):
+    if erro := await _simular("locationiq"):
+        return erro
+    celula = f"{round(lat, 2)}:{round(lon, 2)}"
+    return {
+        "lat": str(lat),
+        "lon": str(lon),
+        "boundingbox": [
+            str(lat - 0.001),
+            str(lat + 0.001),
+            str(lon - 0.001),
+            str(lon + 0.001),
+        ],
+        "address": {
+            "road": f"Rodovia {_numero(celula, 500)}",
+            "neighbourhood": f"Bairro {_numero(celula, 200)}",
+            "town": f"Cidade {_numero(f'{round(lat, 1)}:{round(lon, 1)}', 900)}",
+            "state": "São Paulo",
+            "postcode": f"{_numero(celula, 99_999):05d}-000",
+        },
+    }
+
+
+@app.get("/overpass/api/interpreter")
+async def overpass(data: str):
+    if erro := await _simular("overpass"):
+        return erro
+    return {
+        "elements": [
+            {
+                "type": "node",
+                "id": _numero(data + str(i), 10**10),
+                "lat": _coordenadas(data + str(i))[0],
+                "lon": _coordenadas(data + str(i))[1],
+                "tags": {"amenity": "cafe", "name": f"Local {i}"},
+            }
+            for i in range(20)
+        ]
+    }
+
+
+@app.get("/tomtom/traffic/services/4/incidentViewport/{caminho:path}")
+async def tomtom_incidentes(caminho: str):
+    if erro := await _simular("tomtom"):
+        return erro
+    return {"viewpResp": {"trafficState": {"@trafficAge": 30, "incidents": []}}}
+
+
+@app.get("/tomtom/traffic/services/4/flowSegmentData/{caminho:path}")
+async def tomtom_fluxo(caminho: str, point: str):
+    if erro := await _simular("tomtom"):
+        return erro
+    velocidade = 30 + _numero(point, 60)
+    return {
+        "flowSegmentData": {
+            "currentSpeed": velocidade,
+            "freeFlowSpeed": 90,
+            "currentTravelTime": 5400 // velocidade,
+            "freeFlowTravelTime": 60,
+            "confidence": 1,
+            "roadClosure": False,
+        }
+    }
+
+
+@app.get("/tomtom/routing/1/calculateRoute/{trecho}/json")
+async def tomtom_rota(trecho: str):
+    if erro := await _simular("tomtom"):
+        return erro
+    (lat1, lon1), (lat2, lon2) = (
+        map(float, ponto.split(",")) for ponto in trecho.split(":")
+    )
+    distancia = _haversine(lat1, lon1, lat2, lon2) * 1.3
+    quantidade = max(2, min(int(distancia / 100), 20_000))
+    pontos = [
+        {
+            "latitude": round(lat1 + (lat2 - lat1) * i / (quantidade - 1), 5),
+            "longitude": round(lon1 + (lon2 - lon1) * i / (quantidade - 1), 5),
+        }
+        for i in range(quantidade)
+    ]
+    return {
+        "routes": [
+            {
+                "summary": {
+                    "lengthInMeters": int(distancia),
+                    "travelTimeInSeconds": int(distancia / 20),
+                },
+                "sections": [{"travelMode": "car"}],
+                "legs": [{"points": pontos}],
+            }
+        ]
+    }
+
+
+@app.post("/tomtom/routing/matrix/2")
+async def tomtom_matriz(request: Request):
+    if erro := await _simular("tomtom"):
+        return erro
+    corpo = await request.json()
+    return {
+        "data": [
+            {
+                "originIndex": i,
+                "destinationIndex": j,
+                "routeSummary": {
+                    "lengthInMeters": int(
+                        _haversine(
+                            origem["point"]["latitude"],
+                            origem["point"]["longitude"],
+                            destino["point"]["latitude"],
+                            destino["point"]["longitude"],
+                        )
+                        * 1.3
+                    ),
+                    "travelTimeInSeconds": 600,
+                },
+            }
+            for i, origem in enumerate(corpo["origins"])
+            for j, destino in enumerate(corpo["destinations"])
+        ]
+    }
+
+
+@app.get("/weatherapi/v1/forecast.json")
+async def weatherapi(q: str, days: int = 1):
+    if erro := await _simular("weatherapi"):
+        return erro
+    codigos = [(1000, "Sunny"), (1003, "Partly cloudy"), (1063, "Patchy rain nearby")]
+    return {
+        "forecast": {
+            "forecastday": [
+                {
+                    "date": f"2030-01-{dia + 1:02d}",
+                    "day": {
+                        "maxtemp_c": 30.1,
+                        "mintemp_c": 18.4,
+                        "avgtemp_c": 24.2,
+                        "condition": dict(
+                            zip(("code", "text"), codigos[_numero(q + str(dia), 3)])
+                        ),
+                    },
+                }
+                for dia in range(days)
+            ]
+        }
+    }
+
+
+@app.post("/gemini/{versao}/models/{modelo}:generateContent")
+async def gemini(versao: str, modelo: str):
+    if erro := await _simular("gemini"):
+        return erro
+    texto = json.dumps({"resumo": "Trajeto sem ocorrências relevantes.", "riscos": []})
+    return {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": [{"text": texto}]},
+                "finishReason": "STOP",
+            }
+        ]
+    }
@@ -0,0 +1,98 @@
+"""Mede importação, latência de consulta e memória residente do índice local de CEPs.
+
+Uso (na raiz do repositório):
+
+    python -m benchmarks.cep_local [quantidade_de_ceps]
+"""
+
+import csv
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.services.cep_local import IndiceCep, importar_csv
+
+
+def memoria_residente_mb() -> float:
+    with open("/proc/self/status") as status:
+        for linha in status:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return float("nan")
+
+
+def gerar_csv(arquivo: Path, quantidade: int, semente: int = 42):
+    gerador = random.Random(semente)
+    ceps = gerador.sample(range(1_000_000, 99_999_999), quantidade)
+    with open(arquivo, "w", newline="", encoding="utf-8") as saida:
+        escritor = csv.writer(saida)
+        escritor.writerow(
+            ["cep", "logradouro", "bairro", "localidade", "uf", "ibge", "lat", "lon"]
+        )
+        for cep in ceps:
+            escritor.writerow(
+                [
+                    f"{cep:08d}",
+                    f"Rua {gerador.randint(1, 5000)}",
+                    f"Bairro {gerador.randint(1, 800)}",
+                    f"Cidade {cep // 100_000}",
+                    gerador.choice(["SP", "RJ", "MG", "RS", "BA", "PR"]),
+                    str(3_500_000 + cep // 100_000),
+                    f"{gerador.uniform(-33.7, 5.2):.6f}",
+                    f"{gerador.uniform(-73.9, -34.8):.6f}",
+                ]
+            )
+    return ceps
+
+
+def percentis(amostras):
+    p50, p95, p99 = np.percentile(np.array(amostras) * 1e6, [50, 95, 99])
+    return f"p50 {p50:.1f}µs  p95 {p95:.1f}µs  p99 {p99:.1f}µs"
+
+
+def medir(funcao, argumentos):
+    amostras = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcao(argumento)
+        amostras.append(time.perf_counter() - inicio)
+    return percentis(amostras)
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as diretorio:
+        diretorio = Path(diretorio)
+        ceps = gerar_csv(diretorio / "ceps.csv", quantidade)
+        print(f"CSV gerado com {quantidade} CEPs")
+
+        inicio = time.perf_counter()
+        importar_csv(diretorio / "ceps.csv", diretorio / "indice")
+        print(f"importação: {time.perf_counter() - inicio:.1f}s")
+        tamanho = sum(f.stat().st_size for f in (diretorio / "indice").iterdir())
+        print(f"tamanho em disco: {tamanho / 1024 / 1024:.1f} MB")
+
+        antes = memoria_residente_mb()
+        indice = IndiceCep(diretorio / "indice")
+        print(f"memória residente ao abrir: +{memoria_residente_mb() - antes:.1f} MB")
+
+        gerador = random.Random(7)
+        existentes = [f"{cep:08d}" for cep in gerador.sample(ceps, 10_000)]
+        ausentes = [f"{gerador.randrange(100_000_000):08d}" for _ in range(10_000)]
+        prefixos = [cep[:5] for cep in existentes[:1000]]
+
+        print(f"consulta (acerto):   {medir(indice.buscar, existentes)}")
+        print(f"consulta (ausente):  {medir(indice.buscar, ausentes)}")
+        print(f"coordenadas:         {medir(indice.coordenadas_do_cep, existentes)}")
+        print(f"prefixo (5 dígitos): {medir(indice.prefixo, prefixos)}")
+        print(
+            f"memória residente após consultas: +{memoria_residente_mb() - antes:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compara comprimir_pontos_da_rota e simplificar_rota em polylines sintéticas.
+
+Uso (na raiz do repositório):
+
+    python -m benchmarks.simplificacao_rota
+"""
+
+import random
+import timeit
+
+import numpy as np
+
+from app.utils import (
+    comprimir_pontos_da_rota,
+    distancias_acumuladas,
+    simplificar_rota,
+)
+
+
+def gerar_polyline(distancia_km: float, pontos_por_km: float, semente: int = 42):
+    gerador = random.Random(semente)
+    quantidade = max(2, int(distancia_km * pontos_por_km))
+    lat, lon = -23.5505, -46.6333
+    passo_medio = distancia_km / 111.32 / quantidade / 0.85
+    pontos = []
+    for i in range(quantidade):
+        urbano = (i // 500) % 4 == 0
+        passo = passo_medio * (0.2 if urbano else 1.6)
+        lat += passo * gerador.uniform(0.3, 0.9)
+        lon += passo * gerador.uniform(-0.3, 0.3)
+        pontos.append({"latitude": round(lat, 5), "longitude": round(lon, 5)})
+    return pontos
+
+
+def maior_intervalo_km(pontos):
+    acumulado = distancias_acumuladas(pontos)
+    return float(np.max(np.diff(acumulado))) / 1000 if len(pontos) > 1 else 0.0
+
+
+def medir(funcao, pontos, repeticoes: int = 20):
+    return (
+        min(timeit.repeat(lambda: funcao(pontos), number=1, repeat=repeticoes)) * 1000
+    )
+
+
+def main():
+    cenarios = [
+        ("urbano", 5, 100),
+        ("regional", 120, 40),
+        ("longo", 900, 55),
+    ]
+    print(
+        f"{'cenário':<18}{'km':>8}{'entrada':>9}{'função':>12}{'pontos':>8}"
+        f"{'maior intervalo (km)':>22}{'tempo (ms)':>12}"
+    )
+    for nome, distancia_km, densidade in cenarios:
+        pontos = gerar_polyline(distancia_km, densidade)
+        total_km = distancias_acumuladas(pontos)[-1] / 1000
+        for rotulo, funcao in (
+            ("atual", comprimir_pontos_da_rota),
+            ("numpy", lambda pontos: simplificar_rota(pontos, 5000, 5, 30)),
+        ):
+            resultado = funcao(pontos)
+            print(
+                f"{nome:<18}{total_km:>8.1f}{len(pontos):>9}{rotulo:>12}{len(resultado):>8}"
+                f"{maior_intervalo_km(resultado):>22.2f}{medir(funcao, pontos):>12.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
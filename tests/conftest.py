@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+# As configurações são lidas na importação dos módulos do app; os testes não
+# falam com as APIs reais, então qualquer valor serve para as obrigatórias.
+for nome, valor in {
+    "VIACEP_URL": "http://viacep.teste/ws",
+    "LOCATIONIQ_URL": "http://locationiq.teste/v1/search?key=teste",
+    "LOCATIONIQ_REVERSE_GEOCODING_URL": "http://locationiq.teste/v1/reverse.php?key=",
+    "LOCATIONIQ_KEY": "teste",
+    "OVERPASS_URL": 'http://overpass.teste/api/interpreter?data=[out:json];node["amenity"](around:',
+    "TOMTOM_URL": "http://tomtom.teste/traffic/services/4",
+    "TOMTOM_KEY": "teste",
+    "WEATHER_API_URL": "http://weatherapi.teste/v1/forecast.json?key=",
+    "WEATHER_API_KEY": "teste",
+    "GEMINI_KEY": "teste",
+    "GEMINI_MODEL": "gemini-teste",
+    "PROMPT_BASE": "{dados_trajeto}",
+}.items():
+    os.environ.setdefault(nome, valor)
+
+# Testes que usam o banco apagam dados das tabelas; só rodam com um banco
+# próprio para testes em TEST_DATABASE_URL.
+if os.environ.get("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+else:
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://teste@localhost/teste")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def banco():
+    if not os.environ.get("TEST_DATABASE_URL"):
+        pytest.skip("defina TEST_DATABASE_URL para rodar os testes com banco")
+    from app.database.session import create_db_tables, engine
+
+    await create_db_tables()
+    yield engine
+    await engine.dispose()
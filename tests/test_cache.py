@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from app.cache import core
+from app.cache.backends import MemoryBackend
+from app.cache.core import Cache
+from app.cache.spatial import SpatialCache
+
+
+class BackendForaDoAr:
+    nome = "fora_do_ar"
+
+    async def get(self, chave: str):
+        raise ConnectionError("backend indisponível")
+
+    async def set(self, chave: str, valor: str, ttl: int):
+        raise ConnectionError("backend indisponível")
+
+
+@pytest.mark.anyio
+async def test_falha_do_backend_conta_como_falha_do_cache(monkeypatch):
+    monkeypatch.setattr(core, "_backend", BackendForaDoAr())
+    cache = Cache("teste_fora_do_ar", 60)
+
+    await cache.set("chave", {"valor": 1})
+
+    assert await cache.get("chave") == (False, None)
+    assert await cache.get_com_horario("chave") == (False, None, None)
+    assert cache.falhas == 2
+    assert cache.acertos == 0
+
+
+@pytest.mark.anyio
+async def test_gravacoes_simultaneas_na_mesma_celula_sao_mantidas(monkeypatch):
+    monkeypatch.setattr(core, "_backend", MemoryBackend(1000))
+    cache = SpatialCache("teste_espacial", 60, 0.001, 50.0, 16)
+    pontos = [(-23.5501, -46.6331), (-23.5508, -46.6338)]
+
+    await asyncio.gather(
+        *(cache.guardar(lat, lon, {"ponto": i}) for i, (lat, lon) in enumerate(pontos))
+    )
+
+    assert await cache.buscar(-23.55011, -46.63311) == {"ponto": 0}
+    assert await cache.buscar(-23.55079, -46.63379) == {"ponto": 1}
+    assert await cache.buscar(-23.56, -46.64) is None
@@ -0,0 +1,33 @@
+import shutil
+
+from app.services import cep_local
+from app.services.cep_local import importar_csv, obter_indice
+
+
+def test_importacao_ignora_linhas_com_coordenadas_invalidas(tmp_path):
+    arquivo = tmp_path / "ceps.csv"
+    arquivo.write_text(
+        "cep,localidade,lat,lon\n"
+        "01001-000,São Paulo,-23.5503,-46.6339\n"
+        "20040-020,Rio de Janeiro,abc,-43.17\n"
+        "30130-010,Belo Horizonte,-19.92,-243.9\n"
+        "40020-000,Salvador,,\n",
+        encoding="utf-8",
+    )
+
+    assert importar_csv(arquivo, tmp_path / "indice") == (2, 2)
+
+
+def test_indice_aberto_continua_durante_a_troca_do_diretorio(tmp_path, monkeypatch):
+    arquivo = tmp_path / "ceps.csv"
+    arquivo.write_text("cep,localidade\n01001000,São Paulo\n", encoding="utf-8")
+    importar_csv(arquivo, tmp_path / "indice")
+    monkeypatch.setattr(cep_local.settings, "CEP_LOCAL_DIR", str(tmp_path / "indice"))
+    monkeypatch.setattr(cep_local, "_indice", None)
+    indice = obter_indice()
+
+    shutil.rmtree(tmp_path / "indice")
+    monkeypatch.setattr(cep_local, "_verificado_em", 0.0)
+
+    assert obter_indice() is indice
+    assert indice.buscar("01001000")["localidade"] == "São Paulo"
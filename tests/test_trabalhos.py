@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+
+from app.database.models import TrabalhoTrajeto
+from app.database.session import async_session
+from app.services import trabalhos
+from app.services.trabalhos import FilaTrabalhos
+
+
+@pytest.mark.anyio
+async def test_trabalho_reagendado_so_e_reivindicado_apos_a_espera(banco, monkeypatch):
+    async with async_session() as session:
+        await session.execute(delete(TrabalhoTrajeto))
+        await session.commit()
+    monkeypatch.setattr(trabalhos.settings, "TRABALHOS_BACKOFF_SEGUNDOS", 5.0)
+    fila = FilaTrabalhos()
+    id = (await fila.submeter({"cep_origem": "01001000"}, "senha"))["id"]
+
+    async def circuito_aberto(*args):
+        raise HTTPException(503, "circuito aberto", headers={"Retry-After": "30"})
+
+    fila._executar = circuito_aberto
+    await fila._processar_proximo()
+
+    async with async_session() as session:
+        trabalho = await session.get(TrabalhoTrajeto, id)
+    assert trabalho.status == "pendente"
+    assert trabalho.disponivel_em - trabalho.atualizado_em > timedelta(seconds=29)
+    assert await fila._reivindicar() is None
+
+    async with async_session() as session:
+        await session.execute(
+            update(TrabalhoTrajeto)
+            .where(TrabalhoTrajeto.id == id)
+            .values(disponivel_em=trabalhos._agora() - timedelta(seconds=1))
+        )
+        await session.commit()
+    reivindicado = await fila._reivindicar()
+    assert reivindicado.id == id
+    assert reivindicado.tentativas == 2
@@ -0,0 +1,29 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from app.database.models import Trajeto
+from app.database.session import async_session
+from app.services.trajeto import TrajetoService
+
+
+@pytest.mark.anyio
+async def test_insight_vazio_nao_e_removido(banco):
+    async with async_session() as session:
+        service = TrajetoService(session)
+        salvo = await service.add_trajeto("senha", {"rota": []})
+        id = salvo["dados_para_busca"]["id"]
+        await session.execute(
+            update(Trajeto).where(Trajeto.id == id).values(insights={})
+        )
+        await session.commit()
+
+        with pytest.raises(HTTPException) as erro:
+            await service.delete_insight(id, "senha")
+        assert erro.value.status_code == 404
+
+        await session.execute(
+            update(Trajeto).where(Trajeto.id == id).values(insights={"resumo": "ok"})
+        )
+        await session.commit()
+        assert "removido" in (await service.delete_insight(id, "senha"))["detail"]